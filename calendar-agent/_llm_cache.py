@@ -0,0 +1,97 @@
+"""
+LLM Response Cache
+On-disk cache of Gemini responses, keyed by a digest of the prompt
+Backed by sqlite so cached answers survive server restarts
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+class LLMCache:
+    """
+    Exact-match cache of model responses stored in a sqlite database
+    """
+
+    def __init__(self, db_path):
+        """
+        Set up the cache; the database file is created on first use
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database and create the table if needed (call with the lock held)"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(models, prompt):
+        """
+        Build the cache key for a prompt sent to a list of candidate models
+
+        Returns:
+            SHA256 hex digest of the model list and prompt
+        """
+        payload = json.dumps({"model_list": list(models), "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, ttl=1800):
+        """
+        Look up a cached response
+
+        Args:
+            key: Key from make_key()
+            ttl: Maximum age in seconds
+
+        Returns:
+            The cached response text, or None on a miss or if it has expired
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and time.time() - row[1] > ttl:
+                    # Expired entries are never served again, so drop them
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Could not read LLM cache: {e}", flush=True)
+            return None
+
+        return row[0] if row is not None else None
+
+    def put(self, key, response, ttl=1800):
+        """
+        Store a response, replacing any previous entry for the key
+
+        Entries older than ttl seconds are deleted at the same time, so keys
+        that are never looked up again (e.g. yesterday's prompts) don't pile up.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Could not write LLM cache: {e}", flush=True)
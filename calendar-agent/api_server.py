@@ -11,8 +11,8 @@ import requests
 from datetime import datetime, timedelta
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from google import genai
+from calendar_tools import build_calendar_service
 from calendar_agent import calculate_nap_time_tool, calculate_meal_windows_tool, predict_burnout_tool, predict_burnout_batch_tool, load_burnout_cache, optimize_schedule_tool
 import secrets
 from dotenv import load_dotenv
@@ -200,7 +200,7 @@ def list_calendars():
         creds = Credentials.from_authorized_user_file(user_token_path, SCOPES)
 
         # Build service
-        service = build('calendar', 'v3', credentials=creds)
+        service = build_calendar_service(creds)
 
         # Get calendar list
         calendar_list = service.calendarList().list().execute()
@@ -242,7 +242,7 @@ def sync_calendars():
             return jsonify({"error": "Not authenticated"}), 401
 
         creds = Credentials.from_authorized_user_file(user_token_path, SCOPES)
-        service = build('calendar', 'v3', credentials=creds)
+        service = build_calendar_service(creds)
 
         # Fetch all events from selected calendars
         all_events = []
@@ -1212,11 +1212,7 @@ Rules:
 
         if is_stressed and matched_events:
             # Load the FULL cache file (not just predictions) so we can update in place
-            cache_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                "user_data",
-                f"{user_id}_burnout_cache.json"
-            )
+            cache_path = os.path.join(USERS_DIR, f"{user_id}_burnout_cache.json")
 
             cache_data = {}
             predictions = {}
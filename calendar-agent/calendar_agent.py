@@ -4,13 +4,33 @@ No LangChain dependency
 """
 
 import os
+import sys
+import functools
 import json
+import re
+import string
+import bisect
+import hashlib
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
+from itertools import accumulate
+from operator import itemgetter, le, sub
+from zoneinfo import ZoneInfo
 from google import genai
 from google.genai import types
 from calendar_tools import get_calendar_tool_instance
+from _llm_cache import LLMCache
 import requests
 import time
+import asyncio
+import threading
+
+# orjson is optional; it parses large JSON files and responses several times faster
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 
 # Initialize calendar lazily (only when needed)
@@ -28,7 +48,575 @@ def get_calendar():
     return calendar
 
 
-def _try_rest_api_fallback(api_key: str, prompt: str, last_error: Exception = None) -> str:
+# Meal keywords looked for in event titles, and the meal type each one implies
+# (None means the event is food-related but the meal type depends on the time)
+MEAL_RE = re.compile(r'\b(breakfast|brunch|lunch|dinner|meal|snack|dining|cafe|restaurant|eat)s?\b', re.IGNORECASE)
+_MEAL_TAG_TYPES = {
+    'breakfast': 'breakfast',
+    'brunch': 'breakfast',
+    'lunch': 'lunch',
+    'dinner': 'dinner',
+    'snack': 'snack',
+}
+
+
+# User's timezone for suggested events
+_PACIFIC_TZ = ZoneInfo('America/Los_Angeles')
+
+# Per-user data files (calendars, burnout cache) live next to this module
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_USER_DATA_DIR = os.path.join(_SCRIPT_DIR, 'user_data')
+
+
+def _user_path(user_id: str, suffix: str) -> str:
+    """Path of a user's data file, e.g. _user_path('u1', 'calendars.json')"""
+    return os.path.join(_USER_DATA_DIR, f'{user_id}_{suffix}')
+
+# List of models to try (prioritize models with available quota)
+# Note: gemma models need -it suffix for instruction-tuned versions
+_MODELS_TO_TRY = [
+    'gemini-3-flash-preview',  # Has quota available
+    'gemini-2.0-flash-lite',  # Alternative flash model
+    'gemma-3-12b-it',  # 0/30 RPM (has quota!)
+    'gemma-3-27b-it',  # 0/30 RPM (has quota!)
+    'gemma-3-4b-it',  # 0/30 RPM (has quota!)
+    'gemma-3-1b-it',  # 0/30 RPM (has quota!)
+    'gemini-2.5-flash',  # May be at quota limit
+    'gemini-2.5-flash-lite',  # May be over quota limit
+]
+
+# Gemini client and API key shared across tool calls (resolved lazily on first use)
+_GENAI_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+_API_KEY = None
+
+
+def _get_api_key():
+    """Get the Gemini API key (GOOGLE_API_KEY or GEMINI_API_KEY), or None if neither is set
+    
+    The key is also exported as GOOGLE_API_KEY so genai.Client() picks it up.
+    """
+    global _API_KEY
+    if _API_KEY is None:
+        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+        if api_key and not os.getenv('GOOGLE_API_KEY'):
+            os.environ['GOOGLE_API_KEY'] = api_key
+        _API_KEY = api_key
+    return _API_KEY
+
+
+def _get_client():
+    """Get the shared Gemini client, creating it on first use"""
+    global _GENAI_CLIENT
+    if _GENAI_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _GENAI_CLIENT is None:
+                _GENAI_CLIENT = genai.Client()
+    return _GENAI_CLIENT
+
+
+# Background event loop for running concurrent Gemini requests from the
+# synchronous tool functions (Flask calls them from its worker threads)
+_ASYNC_LOOP = None
+_ASYNC_LOOP_LOCK = threading.Lock()
+
+
+def _run_async(coro):
+    """Run a coroutine on the shared background event loop and wait for its result"""
+    global _ASYNC_LOOP
+    with _ASYNC_LOOP_LOCK:
+        if _ASYNC_LOOP is None:
+            _ASYNC_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_ASYNC_LOOP.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _ASYNC_LOOP).result()
+
+
+# Per-model circuit breakers shared by every tool that calls Gemini. After
+# _BREAKER_THRESHOLD consecutive failures (or a single quota error) a model is
+# skipped for _BREAKER_COOLDOWN seconds, then a single probe request is let through.
+_MODEL_BREAKERS: dict = {}  # model -> {'failures': int, 'opened_at': float, 'state': str}
+_MODEL_BREAKERS_LOCK = threading.Lock()
+_BREAKER_THRESHOLD = 3
+_BREAKER_COOLDOWN = 60  # seconds
+
+
+def _breaker_allows(model: str) -> bool:
+    """Check whether a request to model should be attempted right now"""
+    with _MODEL_BREAKERS_LOCK:
+        breaker = _MODEL_BREAKERS.get(model)
+        if breaker is None or breaker['state'] == 'closed':
+            return True
+        if time.time() - breaker['opened_at'] < _BREAKER_COOLDOWN:
+            return False
+        # Cooldown is over (or the last probe never reported back): let one probe through
+        if breaker['state'] == 'open':
+            breaker['open_since'] = breaker['opened_at']
+        breaker['state'] = 'half_open'
+        breaker['opened_at'] = time.time()
+        return True
+
+
+def _breaker_cancel(model: str):
+    """Undo _breaker_allows for a request that was cancelled before it finished
+
+    A half-open probe that never got an answer says nothing about the model, so
+    the breaker goes back to open with its original (already expired) cooldown
+    and the next caller can probe straight away.
+    """
+    with _MODEL_BREAKERS_LOCK:
+        breaker = _MODEL_BREAKERS.get(model)
+        if breaker is not None and breaker['state'] == 'half_open' and 'open_since' in breaker:
+            breaker['state'] = 'open'
+            breaker['opened_at'] = breaker.pop('open_since')
+
+
+def _breaker_record(model: str, success: bool, rate_limited: bool = False):
+    """Record the outcome of a request to model
+
+    A rate-limited failure opens the breaker straight away: the model's quota
+    won't be back within the cooldown, so every call would just hit it again.
+    """
+    with _MODEL_BREAKERS_LOCK:
+        if success:
+            _MODEL_BREAKERS.pop(model, None)
+            return
+        breaker = _MODEL_BREAKERS.setdefault(model, {'failures': 0, 'opened_at': 0.0, 'state': 'closed'})
+        breaker['failures'] += 1
+        if rate_limited or breaker['state'] == 'half_open' or breaker['failures'] >= _BREAKER_THRESHOLD:
+            if breaker['state'] != 'open':
+                print(f"Circuit breaker opened for {model}, skipping it for {_BREAKER_COOLDOWN}s", flush=True)
+            breaker['state'] = 'open'
+            breaker['opened_at'] = time.time()
+            breaker.pop('open_since', None)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Check whether an API error is a 429 / quota error"""
+    error_str = str(error)
+    return '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str
+
+
+def _chunk_finish_reason(chunk):
+    """The finish reason a stream chunk carries, or None if it has none"""
+    if chunk.candidates and chunk.candidates[0].finish_reason:
+        return chunk.candidates[0].finish_reason
+    return None
+
+
+def _split_system_instruction(model: str, prompt: str, system_instruction: str = None):
+    """Fit a system instruction to what model accepts
+
+    Only gemini-* models take a separate system instruction; Gemma rejects one
+    with a 400, so for those it goes in front of the prompt instead.
+
+    Returns:
+        (prompt, system_instruction) to send to model
+    """
+    if system_instruction and not model.startswith('gemini-'):
+        return f"{system_instruction}\n\n{prompt}", None
+    return prompt, system_instruction
+
+
+async def _open_stream(client, model: str, prompt: str, system_instruction: str = None):
+    """Start a streamed generation and wait for its first non-empty chunk
+
+    Returns:
+        (first_text, finish_reason, stream) - finish_reason is whatever the chunks
+        read so far reported (None if nothing yet); stream is left open so the
+        caller can read the rest
+
+    Raises:
+        ValueError: If the stream ends without any text (e.g. a safety block)
+    """
+    prompt, system_instruction = _split_system_instruction(model, prompt, system_instruction)
+    config = types.GenerateContentConfig(system_instruction=system_instruction) if system_instruction else None
+    stream = await client.aio.models.generate_content_stream(model=model, contents=prompt, config=config)
+    finish_reason = None
+    async for chunk in stream:
+        finish_reason = _chunk_finish_reason(chunk) or finish_reason
+        if chunk.text:
+            return chunk.text, finish_reason, stream
+    raise ValueError(f"Stream ended without any text ({finish_reason})")
+
+
+async def _read_rest(stream, first_text: str, finish_reason=None) -> str:
+    """Drain an open stream and join its text onto the first chunk
+
+    Args:
+        finish_reason: Finish reason already seen by _open_stream, if any
+
+    Raises:
+        ValueError: If the stream finished for any reason other than STOP (token
+            limit, safety, ...), since the JSON it carries is then cut off
+    """
+    parts = [first_text]
+    _append = parts.append
+    async for chunk in stream:
+        if chunk.text:
+            _append(chunk.text)
+        finish_reason = _chunk_finish_reason(chunk) or finish_reason
+    if finish_reason is not None and finish_reason != types.FinishReason.STOP:
+        raise ValueError(f"Stream ended early ({finish_reason}) after {sum(map(len, parts))} chars")
+    return "".join(parts)
+
+
+async def _close_stream(stream):
+    """Close a stream that won't be read any further (best effort)"""
+    aclose = getattr(stream, 'aclose', None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+async def _attempt_model(sem, client, model: str, prompt: str, timeout: float, system_instruction: str = None):
+    """Open a stream to model once a semaphore slot is free, giving it `timeout` seconds to start answering"""
+    async with sem:
+        return await asyncio.wait_for(_open_stream(client, model, prompt, system_instruction), timeout)
+
+
+async def _race_models(client, models: list, prompt: str, width: int, timeout: float, system_instruction: str):
+    """Start streams to models (at most `width` at once) until one starts answering
+
+    Every model that finishes is removed from `models`.
+
+    Returns:
+        (ready, last_error) - ready lists (model, first_text, finish_reason, stream)
+        for every model that started answering in the winning round
+    """
+    last_error = None
+    sem = asyncio.Semaphore(width)
+    tasks = {
+        asyncio.create_task(_attempt_model(sem, client, model, prompt, timeout, system_instruction)): model
+        for model in models
+    }
+    pending = set(tasks)
+    ready = []
+    try:
+        while pending and not ready:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model = tasks[task]
+                models.remove(model)
+                try:
+                    ready.append((model, *task.result()))
+                except asyncio.TimeoutError:
+                    last_error = TimeoutError(f"No response from {model} within {timeout}s")
+                    _breaker_record(model, False)
+                    print(f"{last_error}, trying next model...", flush=True)
+                except Exception as e:
+                    last_error = e
+                    _breaker_record(model, False, rate_limited=_is_rate_limited(e))
+                    print(f"Model {model} failed: {str(e)[:200]}, trying next model...", flush=True)
+    finally:
+        for task in pending:
+            task.cancel()
+            _breaker_cancel(tasks[task])
+
+    return ready, last_error
+
+
+async def _first_success(client, models: list, prompt: str, width: int = 3, timeout: float = 15,
+                         system_instruction: str = None):
+    """Race models concurrently and return the first successful response
+    
+    Every model gets a streamed request, but a semaphore keeps at most `width`
+    of them in flight, so as soon as one fails the next model starts. The first
+    model to start answering wins and the rest are cancelled, then its stream is
+    read to the end. Models that started answering in the same instant are kept
+    as fallbacks for the winner; if it and they fail mid-stream, the remaining
+    models are raced again.
+
+    Returns:
+        (response_text, last_error) - response_text is None if every model failed
+    """
+    models = [model for model in models if _breaker_allows(model)]
+    last_error = None if models else RuntimeError(f"All models are rate limited, try again in up to {_BREAKER_COOLDOWN}s")
+    ready = []  # (model, first_text, finish_reason, stream) for streams that started answering
+
+    while models or ready:
+        if not ready:
+            ready, error = await _race_models(client, models, prompt, width, timeout, system_instruction)
+            last_error = error or last_error
+            if not ready:
+                break
+        model, first_text, finish_reason, stream = ready.pop(0)
+        try:
+            text = await asyncio.wait_for(_read_rest(stream, first_text, finish_reason), timeout)
+        except Exception as e:
+            last_error = e
+            _breaker_record(model, False)
+            print(f"Model {model} failed mid-stream: {str(e)[:200]}, trying next models...", flush=True)
+            continue
+        for spare_model, _, _, spare in ready:
+            await _close_stream(spare)
+            _breaker_cancel(spare_model)
+        _breaker_record(model, True)
+        print(f"Model {model} succeeded!", flush=True)
+        return text, None
+
+    return None, last_error
+
+
+# On-disk cache for the batch burnout prompt, so an unchanged two-week schedule
+# doesn't go back to Gemini after a server restart
+_LLM_CACHE = LLMCache(os.path.join(_USER_DATA_DIR, 'llm_cache.db'))
+_LLM_CACHE_TTL = 1800  # seconds
+
+
+# In-memory cache of Gemini responses keyed by a digest of the schedule
+# inputs, so reloading the same day doesn't go back to the API
+_RESPONSE_CACHE = OrderedDict()  # key -> (stored_at, response_text)
+_RESPONSE_CACHE_LOCK = threading.Lock()
+_RESPONSE_CACHE_MAXSIZE = 1024
+_RESPONSE_CACHE_TTL = 3600  # seconds
+
+
+def _schedule_cache_key(kind: str, events: list, sleep_time: str, wake_time: str, target_date) -> bytes:
+    """Build a cache key from everything a schedule prompt is derived from"""
+    canonical = tuple(
+        (e['start'].isoformat(), e['end'].isoformat(), e['title'], e.get('description', ''))
+        for e in events
+    )
+    key = (kind, canonical, sleep_time, wake_time, target_date.toordinal())
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).digest()
+
+
+def _response_cache_get(key: bytes):
+    """Return the cached response for key, or None if missing or expired"""
+    with _RESPONSE_CACHE_LOCK:
+        entry = _RESPONSE_CACHE.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > _RESPONSE_CACHE_TTL:
+            del _RESPONSE_CACHE[key]
+            return None
+        _RESPONSE_CACHE.move_to_end(key)
+        return entry[1]
+
+
+def _response_cache_put(key: bytes, response_text: str):
+    """Store a response, evicting the least recently used entries when full"""
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE[key] = (time.monotonic(), response_text)
+        _RESPONSE_CACHE.move_to_end(key)
+        while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAXSIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+
+# English day and month names for the prompt text (index with weekday() / month)
+_WEEKDAY_FULL = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_WEEKDAY_ABBR = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTH_FULL = (None, 'January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December')
+
+
+def _fmt_day(d, with_year: bool = True) -> str:
+    """Format a date as 'Monday, January 05, 2026' (same as strftime('%A, %B %d, %Y'))"""
+    text = f"{_WEEKDAY_FULL[d.weekday()]}, {_MONTH_FULL[d.month]} {d.day:02d}"
+    return f"{text}, {d.year}" if with_year else text
+
+
+def _fmt_ampm(dt) -> str:
+    """Format a datetime/time as 'HH:MM AM' without going through strftime"""
+    h = dt.hour
+    return f"{(h % 12) or 12:02d}:{dt.minute:02d} {'AM' if h < 12 else 'PM'}"
+
+
+def _fmt_short(dt) -> str:
+    """Format a datetime as 'Mon 01/05 09:00 AM' (same as strftime('%a %m/%d %I:%M %p'))"""
+    return f"{_WEEKDAY_ABBR[dt.weekday()]} {dt.month:02d}/{dt.day:02d} {_fmt_ampm(dt)}"
+
+
+# Trailing UTC offset ('Z', '+00:00', '-0800') on an ISO timestamp, stripped when
+# a time is meant to be read as naive local time
+_TZ_RE = re.compile(r'(?:Z|[+-]\d{2}:?\d{2})$')
+
+
+# Parse an ISO 8601 timestamp. ciso8601 is optional and several times faster;
+# without it, Python 3.11+ fromisoformat accepts the trailing 'Z' natively and
+# older versions need it rewritten as an explicit UTC offset
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    if sys.version_info >= (3, 11):
+        _parse_iso = datetime.fromisoformat
+    else:
+        def _parse_iso(value: str) -> datetime:
+            return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+
+
+def _parse_local(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp into a naive datetime in local time"""
+    dt = _parse_iso(value)
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_iso_slow(value: str) -> datetime:
+    """
+    Slow path for timestamps _parse_local() rejects: drop the timezone offset and
+    parse what's left as naive time. Cached, as the same odd strings tend to repeat.
+    """
+    # Remove timezone offset (everything after + or - at the end)
+    if '+' in value:
+        value = value.split('+')[0]
+    elif value.count('-') > 2:  # Has timezone offset
+        # Find the last '-' that's part of timezone (before timezone)
+        parts = value.rsplit('-', 1)
+        if len(parts) == 2 and ':' in parts[1]:
+            value = parts[0]
+    return _parse_iso(value)
+
+
+def _parse_hhmm(value: str):
+    """
+    Parse an 'HH:MM' string into (hour, minute).
+
+    The usual zero-padded form is decoded straight from the characters; anything
+    else (e.g. '8:00') falls back to split/int.
+
+    Raises:
+        ValueError: if the string isn't a valid time of day
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid time: {value!r}")
+    if len(value) == 5 and value[2] == ':' and value.isascii() and value[:2].isdigit() and value[3:].isdigit():
+        hour = (ord(value[0]) - 48) * 10 + (ord(value[1]) - 48)
+        minute = (ord(value[3]) - 48) * 10 + (ord(value[4]) - 48)
+    else:
+        hour, minute = map(int, value.split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {value!r}")
+    return hour, minute
+
+
+# Body of a ```json / ``` markdown fence, wherever it sits in the response
+# (models sometimes put a sentence before it, or get cut off before closing it)
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL)
+
+
+def _strip_markdown_fence(text: str) -> str:
+    """Strip a ```json / ``` markdown fence that models sometimes wrap JSON in"""
+    m = _FENCE_RE.search(text)
+    return (m.group(1) if m else text).strip()
+
+
+def _norm(ev, _get=dict.get):
+    """Return (title, description) for a raw event, with the usual defaults"""
+    return _get(ev, 'title') or _get(ev, 'summary', 'Event'), _get(ev, 'description', '')
+
+
+def _extract_times(ev, prefer_ts: bool = False, _get=dict.get):
+    """
+    Pull the raw start/end timestamps out of an event.
+
+    Handles MongoDB events (startISO/endISO, startTs/endTs) and Google Calendar
+    events (start.dateTime / start.date). prefer_ts checks startTs/endTs before
+    startISO/endISO.
+
+    Returns:
+        (startISO, endISO) - either may be None
+    """
+    if prefer_ts:
+        startISO = _get(ev, 'startTs') or _get(ev, 'startISO')
+        endISO = _get(ev, 'endTs') or _get(ev, 'endISO')
+    else:
+        startISO = _get(ev, 'startISO') or _get(ev, 'startTs')
+        endISO = _get(ev, 'endISO') or _get(ev, 'endTs')
+    if not startISO:
+        start_data = _get(ev, 'start', {})
+        if isinstance(start_data, dict):
+            startISO = start_data.get('dateTime') or start_data.get('date')
+        else:
+            startISO = str(start_data) if start_data else None
+    if not endISO:
+        end_data = _get(ev, 'end', {})
+        if isinstance(end_data, dict):
+            endISO = end_data.get('dateTime') or end_data.get('date')
+        else:
+            endISO = str(end_data) if end_data else None
+    return startISO, endISO
+
+
+_BACK_TO_BACK_GAP = timedelta(minutes=15)
+_SHORT_GAP = timedelta(minutes=30)
+
+
+def _schedule_metrics(starts: list, ends: list):
+    """
+    Aggregate schedule metrics for a day from its start and end columns (sorted by start).
+
+    Works on whole columns at once; the per-event durations are returned so the
+    schedule text can reuse them instead of recomputing each one.
+
+    Returns:
+        (durations_h, total_hours, back_to_back_count, short_gaps)
+    """
+    if not starts:
+        return [], 0, 0, 0
+    durations_h = [d.total_seconds() / 3600 for d in map(sub, ends, starts)]
+    gaps = list(map(sub, starts[1:], ends[:-1]))
+    back_to_back_count = sum(g <= _BACK_TO_BACK_GAP for g in gaps)
+    short_gaps = sum(_BACK_TO_BACK_GAP < g < _SHORT_GAP for g in gaps)
+    return durations_h, sum(durations_h), back_to_back_count, short_gaps
+
+
+# Burnout status for each score 0-100 (0-30 stable, 31-50 building, 51-70 high-risk, 71+ critical)
+_STATUS_TABLE = ('stable',) * 31 + ('building',) * 20 + ('high-risk',) * 20 + ('critical',) * 30
+
+
+def _local_burnout_score(starts: list, ends: list, sleep_duration: float, recent_scores: list = ()) -> dict:
+    """
+    Deterministic burnout estimate from schedule metrics alone.
+
+    Used when there is nothing worth asking Gemini about (no events) or when every
+    model has failed, so burnout predictions keep working offline.
+
+    Args:
+        starts, ends: Start/end columns of the day's events, sorted by start
+        sleep_duration: Hours of sleep before the day
+        recent_scores: Burnout scores from the previous days, if any
+
+    Returns:
+        Dict with the same fields as the Gemini burnout response
+        (score, status, reasoning, key_factors, recommendations)
+    """
+    _, total_hours, back_to_back_count, _ = _schedule_metrics(starts, ends)
+    num_events = len(starts)
+    score = (10 + 6 * num_events + 4 * back_to_back_count
+             + 3 * max(0, total_hours - 6) + 10 * max(0, 7 - sleep_duration))
+    if recent_scores:
+        score += 0.5 * sum(recent_scores) / len(recent_scores)
+    score = max(0, min(100, round(score)))
+
+    status = _STATUS_TABLE[score]
+
+    key_factors = []
+    recommendations = []
+    if back_to_back_count:
+        key_factors.append(f"{back_to_back_count} back-to-back events")
+        recommendations.append("Leave at least 15 minutes between events")
+    if total_hours > 6:
+        key_factors.append(f"{total_hours:.1f} hours of scheduled time")
+        recommendations.append("Move or drop a non-essential commitment")
+    if sleep_duration < 7:
+        key_factors.append(f"Only {sleep_duration:.1f} hours of sleep")
+        recommendations.append("Aim for 7-8 hours of sleep")
+
+    return {
+        'score': score,
+        'status': status,
+        'reasoning': (f"Estimated from schedule metrics: {num_events} events, {total_hours:.1f}h scheduled, "
+                      f"{back_to_back_count} back-to-back, {sleep_duration:.1f}h of sleep."),
+        'key_factors': key_factors,
+        'recommendations': recommendations
+    }
+
+
+def _try_rest_api_fallback(api_key: str, prompt: str, last_error: Exception = None,
+                           system_instruction: str = None) -> str:
     """Fallback to REST API when SDK models fail"""
     # Try models that have available quota (with correct model names)
     rest_models = [
@@ -42,13 +630,18 @@ def _try_rest_api_fallback(api_key: str, prompt: str, last_error: Exception = No
     url_template = 'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={key}'
     
     for model in rest_models:
+        if not _breaker_allows(model):
+            continue
         try:
             url = url_template.format(model=model, key=api_key)
+            model_prompt, model_instruction = _split_system_instruction(model, prompt, system_instruction)
             payload = {
                 "contents": [{
-                    "parts": [{"text": prompt}]
+                    "parts": [{"text": model_prompt}]
                 }]
             }
+            if model_instruction:
+                payload["systemInstruction"] = {"parts": [{"text": model_instruction}]}
             
             response = requests.post(url, json=payload, timeout=60)
             
@@ -58,16 +651,20 @@ def _try_rest_api_fallback(api_key: str, prompt: str, last_error: Exception = No
                     content = result['candidates'][0].get('content', {})
                     parts = content.get('parts', [])
                     if parts and 'text' in parts[0]:
+                        _breaker_record(model, True)
                         print(f"✅ REST API fallback succeeded with {model}", flush=True)
                         return parts[0]['text']
             elif response.status_code == 429:
+                _breaker_record(model, False, rate_limited=True)
                 print(f"⚠️  REST API model {model} quota exceeded, trying next...", flush=True)
                 continue
             else:
+                _breaker_record(model, False)
                 print(f"⚠️  REST API model {model} failed: {response.status_code}, trying next...", flush=True)
                 continue
                 
         except Exception as e:
+            _breaker_record(model, False)
             print(f"⚠️  REST API model {model} error: {str(e)[:100]}, trying next...", flush=True)
             continue
     
@@ -94,6 +691,199 @@ When helping users:
 Be concise and helpful. Use the calendar tools to assist users."""
 
 
+# Static part of the meal planning prompt. It goes in as the system instruction
+# so each request only sends the schedule-specific details.
+MEAL_SYSTEM_INSTRUCTION = """You are a nutrition and meal timing expert helping someone plan optimal meal windows for their day.
+
+You will be given the user's schedule for one day, their wake time and bedtime, the free slots between them, the ideal meal windows for their sleep schedule, and the meal-related events already on their calendar.
+
+🍽️ MEAL TIMING SCIENCE PRINCIPLES:
+
+1. **Breakfast**:
+   - Should be eaten within 1-2 hours of waking to kickstart metabolism
+   - Important for energy, focus, and preventing overeating later
+
+2. **Lunch**:
+   - Should be 4-6 hours after breakfast
+   - Midday meal helps maintain steady energy and prevents afternoon crashes
+
+3. **Dinner**:
+   - Should be 3-4 hours before bedtime to allow for digestion
+   - Eating too close to bedtime can disrupt sleep quality
+
+4. **Snacks** (if needed):
+   - Between breakfast and lunch (mid-morning)
+   - Between lunch and dinner (afternoon)
+   - Should be 2-3 hours after main meals
+   - Only recommend if there are long gaps between meals
+
+5. **Timing Guidelines**:
+   - Space meals 4-6 hours apart for optimal digestion
+   - Avoid eating within 3 hours of bedtime
+   - Consider meal prep time and eating duration (typically 30-60 minutes)
+   - Account for buffer time before/after important events or meetings
+   - Factor in commute or preparation time if needed
+
+6. **Context Considerations**:
+   - Consider the intensity of events before/after potential meal times
+   - Leave buffer time if user has important meetings or activities
+   - Consider energy levels throughout the day
+   - Avoid scheduling meals during or immediately before/after intense activities
+
+**CRITICAL CONSTRAINTS**:
+
+1. **NO OVERLAPS WITH EVENTS**:
+   - You MUST ONLY schedule meals inside the AVAILABLE SLOTS you are given
+   - The meal's start AND end time must both fall within a single available slot
+   - If no available slot fits a meal, leave that meal out and explain why in the summary
+
+2. **MEAL TIMING PRIORITY** (strongly prefer better times):
+   - **ALWAYS recommend all three meals** (breakfast, lunch, dinner), but prioritize better timing
+   - **Breakfast**: STRONGLY prefer times between wake time and 10:00 AM. If that's not possible, find the earliest available slot before 12:00 PM
+   - **Lunch**: STRONGLY prefer times between 11:30 AM and 2:00 PM. If that's not possible, find the closest available slot (even if earlier or later)
+   - **Dinner**: STRONGLY prefer times between 5:30 PM and 8:00 PM (and at least 3 hours before bedtime). If that's not possible, find an available evening slot
+   - When the ideal window is blocked, choose the free slot that is CLOSEST in time to the ideal window
+   - Give higher priority_score (8-10) to meals in ideal windows, lower scores (4-7) to meals at suboptimal times
+
+3. **NO DUPLICATE MEALS**:
+   - Meal-related events already on the calendar are given to you as JSON
+   - "already_scheduled_meals" are meal types that are already on the calendar - DO NOT recommend these meal types again
+   - "meal_related_events" with a null "meal_type" (e.g. "Coffee at cafe", "Team meal") should be matched to breakfast, lunch or dinner by their time of day
+   - Only recommend meals that are NOT already on the calendar
+   - If all three main meals (breakfast, lunch, dinner) are already scheduled, return an empty recommendations array with a summary like "All meals are already scheduled for this day"
+
+**IMPORTANT**: You MUST return ONLY valid JSON in this exact format (no markdown, no code blocks, just pure JSON):
+
+{
+  "recommendations": [
+    {
+      "type": "breakfast" or "lunch" or "dinner" or "snack",
+      "title": "Breakfast" or "Lunch" or "Dinner" or "Snack",
+      "start_time": "HH:MM" (24-hour format, e.g., "08:00"),
+      "duration_minutes": 30-60,
+      "reasoning": "Brief explanation of why this time works best",
+      "priority_score": 1-10 (higher is better, based on optimal timing and schedule fit)
+    }
+  ],
+  "summary": "Brief overall explanation of recommendations"
+}
+
+Return meal recommendations for breakfast, lunch, and dinner (and snacks only if needed to fill gaps), sorted by descending priority_score. Prioritize times that work with the user's schedule. All times should be in 24-hour format (HH:MM)."""
+
+
+# Fixed sections of the batch burnout prompt (scoring rules and response schema);
+# only the schedules and sleep details are formatted per request
+_BURNOUT_PROMPT_RULES = """🧠 ANALYZE EACH DAY'S SCHEDULE AND DETERMINE BURNOUT RISK:
+
+Consider these factors when scoring each day:
+
+1. **Schedule Density** - How packed is the day?
+   - Back-to-back events with no breaks are exhausting
+   - Long spans (8+ hours) from first to last event increase fatigue
+   - Many events = more cognitive load and transitions
+
+2. **Event Types** - What kind of activities?
+   - High-stakes (exams, presentations, interviews, deadlines) = HIGH stress
+   - Regular classes/meetings = MODERATE stress
+   - Meals, breaks, naps = RESTORATIVE (reduce stress)
+   - Social activities, exercise, hobbies = can be RESTORATIVE or neutral
+
+3. **Sleep Quality**
+   - <6 hours = significantly increased burnout risk
+   - 6-7 hours = somewhat elevated risk
+   - 7-8 hours = optimal
+   - >8 hours = well-rested
+
+4. **Cumulative Effects**
+   - Consecutive high-stress days compound fatigue
+   - Rest days help recovery
+   - Consider the week's pattern, not just each day in isolation
+
+📊 SCORING SCALE (0-100):
+- 0-25: Very low risk - light day, plenty of breaks, restorative activities
+- 26-40: Low risk - manageable schedule, some commitments but balanced
+- 41-55: Moderate risk - busy day, limited breaks, building stress
+- 56-70: High risk - packed schedule, back-to-back events, limited recovery
+- 71-85: Very high risk - overwhelming schedule, multiple high-stakes events
+- 86-100: Critical - unsustainable, immediate intervention needed
+
+**IMPORTANT**:
+- A day with 5+ back-to-back classes/meetings is NOT "low risk"
+- Meals and naps scheduled in gaps are GOOD - they reduce the score
+- Look at the ACTUAL event names to determine if they're stressful or restorative
+- Empty days or days with only 1-2 events should score LOW (under 30)"""
+
+_BURNOUT_PROMPT_SCHEMA = """Return ONLY valid JSON (no markdown, no code blocks):
+
+{
+  "predictions": [
+    {
+      "date": "YYYY-MM-DD",
+      "score": 0-100 (integer),
+      "status": "stable" or "building" or "high-risk" or "critical",
+      "reasoning": "Brief explanation based on specific events"
+    }
+  ]
+}"""
+
+
+# Rules and response schema of the schedule optimization prompt. Only the sleep
+# window varies, so the rendered text is cached per (sleep_time, wake_time)
+_OPTIMIZE_RULES_TMPL = string.Template("""CRITICAL OPTIMIZATION RULES (MUST FOLLOW ALL):
+1. **SAME DAY ONLY** - The proposed_start date MUST match current_start date EXACTLY!
+   - If current is 2026-01-13, proposed MUST be 2026-01-13 (NOT 2026-01-14 or 2026-01-15!)
+   - NEVER change the YYYY-MM-DD portion, only change the HH:MM:SS
+   - A meal on Wednesday stays on Wednesday, a nap on Monday stays on Monday
+2. **ABSOLUTELY NO CONFLICTS** - Before proposing ANY time, verify it does NOT overlap with fixed events:
+   - For each malleable event, look at the FIXED events on that SAME DAY
+   - Your proposed time CANNOT start during a fixed event
+   - Your proposed time CANNOT end during a fixed event
+   - Example: If pstat 171 is 14:00-15:00, you CANNOT propose 14:00, 14:30, or any time that overlaps
+3. Keep at least 15-minute buffers between events when possible
+4. Avoid scheduling events during sleep hours ($sleep_time to $wake_time)
+5. Consider event types for optimal timing (but ONLY if the slot is FREE):
+   - Breakfast: 7-9 AM
+   - Lunch: 11 AM - 1 PM (but CHECK for conflicts first!)
+   - Dinner: 5-8 PM
+   - Naps: Early afternoon (1-4 PM) for best rest
+   - Exercise: Morning (6-10 AM) or late afternoon (4-6 PM)
+6. Preserve the original duration of each event
+7. If no conflict-free optimal time exists, use action "keep" instead of "move"
+
+IMPORTANT:
+- Use 24-HOUR TIME FORMAT (e.g., 14:00 for 2 PM, 09:00 for 9 AM)
+- Use the EXACT ISO format from the input for dates
+- The proposed times must use the SAME date as the current_start (same YYYY-MM-DD)
+
+For each malleable event, decide:
+- KEEP: If current time is already good for that event type
+- MOVE: Only if a significantly better time slot exists ON THE SAME DAY
+
+Return ONLY valid JSON (no markdown):
+
+{
+  "proposed_changes": [
+    {
+      "event_id": "the event's ID (copy exactly from input)",
+      "event_title": "event title",
+      "action": "keep" or "move",
+      "current_start": "copy the ISO Start from input",
+      "current_end": "copy the ISO End from input",
+      "proposed_start": "YYYY-MM-DDTHH:MM:SS (24-hour format! 2PM = 14:00, same date as current)",
+      "proposed_end": "YYYY-MM-DDTHH:MM:SS (24-hour format! maintain original duration)",
+      "reasoning": "Brief explanation of why this time is better (or why keeping is best)"
+    }
+  ],
+  "summary": "Brief overall optimization summary"
+}""")
+
+
+@functools.lru_cache(maxsize=16)
+def _optimize_rules(sleep_time: str, wake_time: str) -> str:
+    """Render the optimization rules for a sleep window"""
+    return _OPTIMIZE_RULES_TMPL.substitute(sleep_time=sleep_time, wake_time=wake_time)
+
+
 # Define tool functions for Gemini
 def get_calendar_events_tool(days_ahead: int = 7) -> str:
     """Get upcoming events from Google Calendar
@@ -235,12 +1025,7 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
                 startISO = raw.get('start', {}).get('dateTime') or raw.get('start', {}).get('date')
             if startISO:
                 try:
-                    dt_str = startISO
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str[:-1] + '+00:00'
-                    event_dt = datetime.fromisoformat(dt_str)
-                    if event_dt.tzinfo:
-                        event_dt = event_dt.astimezone().replace(tzinfo=None)
+                    event_dt = _parse_local(startISO)
                     if event_dt.date() == target_date:
                         # Parse end time - handle both MongoDB format and Google Calendar format
                         endISO = event.get('endISO')
@@ -254,11 +1039,7 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
                         
                         if endISO:
                             if isinstance(endISO, str):
-                                if endISO.endswith('Z'):
-                                    endISO = endISO[:-1] + '+00:00'
-                                event_end = datetime.fromisoformat(endISO)
-                                if event_end.tzinfo:
-                                    event_end = event_end.astimezone().replace(tzinfo=None)
+                                event_end = _parse_local(endISO)
                             else:
                                 event_end = event_dt + timedelta(hours=1)
                         else:
@@ -279,24 +1060,24 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
         # Format schedule for Gemini prompt
         schedule_text = ""
         if day_events:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\n\n"
+            schedule_text = f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\n\n"
             for event in day_events:
-                start_time = event['start'].strftime('%I:%M %p')
-                end_time = event['end'].strftime('%I:%M %p')
+                start_time = _fmt_ampm(event['start'])
+                end_time = _fmt_ampm(event['end'])
                 schedule_text += f"• {start_time} - {end_time}: {event['title']}\n"
                 if event.get('description'):
                     desc = event['description'][:80] + '...' if len(event['description']) > 80 else event['description']
                     schedule_text += f"  Description: {desc}\n"
         else:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\nNo events scheduled for this day.\n"
+            schedule_text = f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\nNo events scheduled for this day.\n"
         
         # Calculate free time slots from day_events
         free_slots_30 = []
         free_slots_90 = []
         
         # Day starts at 8 AM and ends at 10 PM for nap calculations
-        day_start = datetime.combine(target_date, datetime.min.time().replace(hour=8, minute=0))
-        day_end = datetime.combine(target_date, datetime.min.time().replace(hour=22, minute=0))
+        day_start = datetime(target_date.year, target_date.month, target_date.day, 8, 0)
+        day_end = datetime(target_date.year, target_date.month, target_date.day, 22, 0)
         
         if day_events:
             # Find gaps between events
@@ -333,33 +1114,33 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
             free_slots_text += "30-minute slots (for power naps):\n"
             for start, end in free_slots_30[:10]:
                 if start.date() == target_date:
-                    free_slots_text += f"  • {start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}\n"
+                    free_slots_text += f"  • {_fmt_ampm(start)} - {_fmt_ampm(end)}\n"
             
             free_slots_text += "\n90-minute slots (for full cycle naps):\n"
             for start, end in free_slots_90[:10]:
                 if start.date() == target_date:
-                    free_slots_text += f"  • {start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}\n"
+                    free_slots_text += f"  • {_fmt_ampm(start)} - {_fmt_ampm(end)}\n"
         else:
             free_slots_text += "No significant free time slots found.\n"
         
         # Parse sleep and wake times
+        year, month, day = target_date.year, target_date.month, target_date.day
         try:
-            sleep_hour, sleep_minute = map(int, sleep_time.split(':'))
-            wake_hour, wake_minute = map(int, wake_time.split(':'))
-            sleep_time_obj = datetime.min.time().replace(hour=sleep_hour, minute=sleep_minute)
-            wake_time_obj = datetime.min.time().replace(hour=wake_hour, minute=wake_minute)
+            sleep_hour, sleep_minute = _parse_hhmm(sleep_time)
+            wake_hour, wake_minute = _parse_hhmm(wake_time)
+            sleep_dt = datetime(year, month, day, sleep_hour, sleep_minute)
+            wake_dt = datetime(year, month, day, wake_hour, wake_minute)
         except (ValueError, AttributeError):
             # Default to midnight and 8 AM if parsing fails
-            sleep_time_obj = datetime.min.time().replace(hour=0, minute=0)
-            wake_time_obj = datetime.min.time().replace(hour=8, minute=0)
+            sleep_dt = datetime(year, month, day, 0, 0)
+            wake_dt = datetime(year, month, day, 8, 0)
         
-        sleep_time_str = sleep_time_obj.strftime('%I:%M %p')
-        wake_time_str = wake_time_obj.strftime('%I:%M %p')
+        sleep_time_str = _fmt_ampm(sleep_dt)
+        wake_time_str = _fmt_ampm(wake_dt)
         
         # Calculate latest nap time (6-8 hours before bedtime)
-        sleep_dt = datetime.combine(target_date, sleep_time_obj)
         latest_nap_end = sleep_dt - timedelta(hours=6)  # 6 hours before bedtime
-        latest_nap_time_str = latest_nap_end.strftime('%I:%M %p')
+        latest_nap_time_str = _fmt_ampm(latest_nap_end)
         
         # Build comprehensive prompt for Gemini
         nap_prompt = f"""You are a sleep science expert helping someone plan optimal nap times for their day.
@@ -406,7 +1187,7 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
    - The free time slots listed above are the ONLY valid times for nap recommendations
    - If no suitable free slots exist, explain this in the summary rather than creating conflicting recommendations
 
-**TASK**: Based on the user's schedule above and the available free time slots, provide personalized nap recommendations for {target_date.strftime('%A, %B %d, %Y')}.
+**TASK**: Based on the user's schedule above and the available free time slots, provide personalized nap recommendations for {_fmt_day(target_date)}.
 
 **IMPORTANT**: You MUST return ONLY valid JSON in this exact format (no markdown, no code blocks, just pure JSON):
 
@@ -427,68 +1208,17 @@ def calculate_nap_time_tool(date_str: str, user_id: str = 'default_user',
 Return EXACTLY 2 best nap recommendations total (can be mix of power nap and full cycle, choose the 2 most optimal times). Prioritize times in the 1:00 PM - 3:00 PM window. All times should be in 24-hour format (HH:MM)."""
         
         # Get API key and set up Gemini client
-        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+        api_key = _get_api_key()
         
         if not api_key:
             return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found"})
         
-        # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-        if not os.getenv('GOOGLE_API_KEY'):
-            os.environ['GOOGLE_API_KEY'] = api_key
-        
-        # Create Gemini client
-        client = genai.Client()
-        
-        # List of models to try (prioritize models with available quota)
-        # Note: gemma models need -it suffix for instruction-tuned versions
-        models_to_try = [
-            'gemini-3-flash-preview',  # Has quota available
-            'gemini-2.0-flash-lite',  # Alternative flash model
-            'gemma-3-12b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-27b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-4b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-1b-it',  # 0/30 RPM (has quota!)
-            'gemini-2.5-flash',  # May be at quota limit
-            'gemini-2.5-flash-lite',  # May be over quota limit
-        ]
-        
-        last_error = None
-        gemini_response = None
+        # Reuse the shared Gemini client
+        client = _get_client()
+        models_to_try = _MODELS_TO_TRY
         
-        for model in models_to_try:
-            try:
-                response = client.models.generate_content(
-                    model=model,
-                    contents=nap_prompt,
-                )
-                gemini_response = response.text
-                break
-
-            except Exception as e:
-                error_str = str(e)
-                # If it's a quota error, wait a bit and retry once
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                    print(f"Model {model} quota exceeded, waiting 2 seconds and retrying...", flush=True)
-                    time.sleep(2)
-                    try:
-                        response = client.models.generate_content(
-                            model=model,
-                            contents=nap_prompt,
-                        )
-                        gemini_response = response.text
-                        break
-                    except Exception as e2:
-                        last_error = e2
-                        print(f"Model {model} still failed after retry: {str(e2)[:200]}, trying next model...", flush=True)
-                        continue
-                # If it's a model not found error, try next model
-                elif '404' in error_str or 'NOT_FOUND' in error_str:
-                    last_error = e
-                    print(f"Model {model} not found: {error_str[:200]}, trying next model...", flush=True)
-                    continue
-                # If it's not a recoverable error, raise it immediately
-                else:
-                    raise
+        # Race the candidate models concurrently and take the first answer
+        gemini_response, last_error = _run_async(_first_success(client, models_to_try, nap_prompt))
 
         # If all SDK models failed, try REST API as fallback
         if not gemini_response:
@@ -501,24 +1231,14 @@ Return EXACTLY 2 best nap recommendations total (can be mix of power nap and ful
         # Parse Gemini's JSON response
         try:
             # Clean up the response - remove markdown code blocks if present
-            cleaned_response = gemini_response.strip()
-            if cleaned_response.startswith('```json'):
-                cleaned_response = cleaned_response[7:]
-            elif cleaned_response.startswith('```'):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith('```'):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            recommendations_data = json.loads(cleaned_response)
+            recommendations_data = _loads(_strip_markdown_fence(gemini_response))
             
             # Convert recommendations to calendar event format
             calendar_events = []
             recommendations = recommendations_data.get('recommendations', [])
             
-            # Sort by priority_score if available, otherwise keep order
-            if recommendations and 'priority_score' in recommendations[0]:
-                recommendations.sort(key=lambda x: x.get('priority_score', 0), reverse=True)
+            # Sort by priority_score (missing scores last, otherwise order is kept)
+            recommendations.sort(key=lambda x: x.get('priority_score', 0), reverse=True)
             
             # Limit to top 2 best recommendations
             recommendations = recommendations[:2]
@@ -532,13 +1252,13 @@ Return EXACTLY 2 best nap recommendations total (can be mix of power nap and ful
                 
                 # Parse time and create datetime objects
                 try:
-                    hour, minute = map(int, start_time_str.split(':'))
-                    start_dt = datetime.combine(target_date, datetime.min.time().replace(hour=hour, minute=minute))
+                    hour, minute = _parse_hhmm(start_time_str)
+                    start_dt = datetime(target_date.year, target_date.month, target_date.day, hour, minute)
                     end_dt = start_dt + timedelta(minutes=duration)
                     
-                    # Format as ISO 8601 with timezone (Pacific Time)
-                    start_iso = start_dt.strftime('%Y-%m-%dT%H:%M:%S-08:00')
-                    end_iso = end_dt.strftime('%Y-%m-%dT%H:%M:%S-08:00')
+                    # Format as ISO 8601 with the Pacific Time offset (PST or PDT)
+                    start_iso = start_dt.replace(tzinfo=_PACIFIC_TZ).isoformat(timespec='seconds')
+                    end_iso = end_dt.replace(tzinfo=_PACIFIC_TZ).isoformat(timespec='seconds')
                     
                     # Create calendar event in Google Calendar format
                     # These are suggested events for frontend display - user will choose which to keep
@@ -622,52 +1342,29 @@ def calculate_meal_windows_tool(date_str: str, user_id: str = 'default_user',
         # Filter events for the target date (works for both MongoDB and JSON formats)
         for event in all_events:
             # Handle multiple timestamp formats: startTs (MongoDB), startISO, start.dateTime (Google Calendar)
-            startISO = event.get('startTs') or event.get('startISO')
-            if not startISO:
-                start_data = event.get('start', {})
-                if isinstance(start_data, dict):
-                    startISO = start_data.get('dateTime') or start_data.get('date')
-                else:
-                    startISO = str(start_data) if start_data else None
+            startISO, endISO = _extract_times(event, prefer_ts=True)
             
             if startISO:
                 try:
                     # Handle timezone formats
-                    dt_str = startISO
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str[:-1] + '+00:00'
-                    event_dt = datetime.fromisoformat(dt_str)
-                    if event_dt.tzinfo:
-                        event_dt = event_dt.astimezone().replace(tzinfo=None)
+                    event_dt = _parse_local(startISO)
                     
                     # Check if event is on target date
                     if event_dt.date() == target_date:
-                        # Parse end time - handle multiple formats: endTs (MongoDB), endISO, end.dateTime
-                        endISO = event.get('endTs') or event.get('endISO')
-                        if not endISO:
-                            end_data = event.get('end', {})
-                            if isinstance(end_data, dict):
-                                endISO = end_data.get('dateTime') or end_data.get('date')
-                            else:
-                                endISO = str(end_data) if end_data else None
-                        
                         if endISO:
                             if isinstance(endISO, str):
-                                if endISO.endswith('Z'):
-                                    endISO = endISO[:-1] + '+00:00'
-                                event_end = datetime.fromisoformat(endISO)
-                                if event_end.tzinfo:
-                                    event_end = event_end.astimezone().replace(tzinfo=None)
+                                event_end = _parse_local(endISO)
                             else:
                                 event_end = event_dt + timedelta(hours=1)
                         else:
                             event_end = event_dt + timedelta(hours=1)
                         
+                        title, description = _norm(event)
                         day_events.append({
-                            'title': event.get('title') or event.get('summary', 'Event'),
+                            'title': title,
                             'start': event_dt,
                             'end': event_end,
-                            'description': event.get('description', '')
+                            'description': description
                         })
                 except (ValueError, AttributeError):
                     continue
@@ -677,37 +1374,51 @@ def calculate_meal_windows_tool(date_str: str, user_id: str = 'default_user',
         # Sort events by start time
         day_events.sort(key=lambda x: x['start'])
         
-        # Format schedule for Gemini prompt
-        schedule_text = ""
+        # Format schedule for Gemini prompt, tagging meal-related events as we go
+        scheduled_meals = set()
+        meal_related_events = []
         if day_events:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\n\n"
+            parts = [f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\n\n"]
+            _append = parts.append
             for event in day_events:
-                start_time = event['start'].strftime('%I:%M %p')
-                end_time = event['end'].strftime('%I:%M %p')
-                schedule_text += f"• {start_time} - {end_time}: {event['title']}\n"
+                start_time = _fmt_ampm(event['start'])
+                end_time = _fmt_ampm(event['end'])
+                _append(f"• {start_time} - {end_time}: {event['title']}\n")
                 if event.get('description'):
                     desc = event['description'][:80] + '...' if len(event['description']) > 80 else event['description']
-                    schedule_text += f"  Description: {desc}\n"
+                    _append(f"  Description: {desc}\n")
+
+                event['meal_tag'] = m.group(1).lower() if (m := MEAL_RE.search(event['title'])) else None
+                if event['meal_tag']:
+                    meal_type = _MEAL_TAG_TYPES.get(event['meal_tag'])
+                    if meal_type:
+                        scheduled_meals.add(meal_type)
+                    meal_related_events.append({
+                        'title': event['title'],
+                        'start': event['start'].strftime('%H:%M'),
+                        'end': event['end'].strftime('%H:%M'),
+                        'meal_type': meal_type
+                    })
+            schedule_text = "".join(parts)
         else:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\nNo events scheduled for this day.\n"
+            schedule_text = f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\nNo events scheduled for this day.\n"
         
         # Parse sleep and wake times
+        year, month, day = target_date.year, target_date.month, target_date.day
         try:
-            sleep_hour, sleep_minute = map(int, sleep_time.split(':'))
-            wake_hour, wake_minute = map(int, wake_time.split(':'))
-            sleep_time_obj = datetime.min.time().replace(hour=sleep_hour, minute=sleep_minute)
-            wake_time_obj = datetime.min.time().replace(hour=wake_hour, minute=wake_minute)
+            sleep_hour, sleep_minute = _parse_hhmm(sleep_time)
+            wake_hour, wake_minute = _parse_hhmm(wake_time)
+            sleep_dt = datetime(year, month, day, sleep_hour, sleep_minute)
+            wake_dt = datetime(year, month, day, wake_hour, wake_minute)
         except (ValueError, AttributeError):
             # Default to midnight and 8 AM if parsing fails
-            sleep_time_obj = datetime.min.time().replace(hour=0, minute=0)
-            wake_time_obj = datetime.min.time().replace(hour=8, minute=0)
+            sleep_dt = datetime(year, month, day, 0, 0)
+            wake_dt = datetime(year, month, day, 8, 0)
         
-        sleep_time_str = sleep_time_obj.strftime('%I:%M %p')
-        wake_time_str = wake_time_obj.strftime('%I:%M %p')
+        sleep_time_str = _fmt_ampm(sleep_dt)
+        wake_time_str = _fmt_ampm(wake_dt)
         
         # Calculate meal timing windows based on wake/sleep times
-        wake_dt = datetime.combine(target_date, wake_time_obj)
-        sleep_dt = datetime.combine(target_date, sleep_time_obj)
         
         # Ideal breakfast: 1-2 hours after waking
         breakfast_start = wake_dt + timedelta(hours=1)
@@ -721,194 +1432,93 @@ def calculate_meal_windows_tool(date_str: str, user_id: str = 'default_user',
         dinner_end = sleep_dt - timedelta(hours=3)
         dinner_start = sleep_dt - timedelta(hours=5)
         
-        # Build comprehensive prompt for Gemini
-        meal_prompt = f"""You are a nutrition and meal timing expert helping someone plan optimal meal windows for their day.
+        # Sweep the sorted events from wake to bedtime to find the free slots
+        # meals can go in, so Gemini only has to pick among valid times
+        day_end = sleep_dt if sleep_dt > wake_dt else sleep_dt + timedelta(days=1)
+        busy = [(e['start'], e['end']) for e in day_events]
+        free = []
+        cursor = wake_dt
+        for busy_start, busy_end in busy:
+            if busy_start > cursor:
+                free.append((cursor, min(busy_start, day_end)))
+            cursor = max(cursor, busy_end)
+            if cursor >= day_end:
+                break
+        if cursor < day_end:
+            free.append((cursor, day_end))
+        free = [(start, end) for start, end in free if end - start >= timedelta(minutes=30)]
 
-{schedule_text}
+        if free:
+            available_slots_text = "".join(f"  • {_fmt_ampm(start)} - {_fmt_ampm(end)}\n" for start, end in free)
+        else:
+            available_slots_text = "  No free slots of 30+ minutes between wake time and bedtime.\n"
+
+        existing_meals_json = json.dumps({
+            'already_scheduled_meals': sorted(scheduled_meals),
+            'meal_related_events': meal_related_events
+        })
+
+        # Build comprehensive prompt for Gemini
+        meal_prompt = f"""{schedule_text}
 
 😴 USER'S SLEEP SCHEDULE:
 - Wake time: {wake_time_str}
 - Bedtime: {sleep_time_str}
 
-🍽️ MEAL TIMING SCIENCE PRINCIPLES:
-
-1. **Breakfast**:
-   - Should be eaten within 1-2 hours of waking to kickstart metabolism
-   - Ideal window: {breakfast_start.strftime('%I:%M %p')} - {breakfast_end.strftime('%I:%M %p')}
-   - Important for energy, focus, and preventing overeating later
-
-2. **Lunch**:
-   - Should be 4-6 hours after breakfast
-   - Ideal window: {lunch_start.strftime('%I:%M %p')} - {lunch_end.strftime('%I:%M %p')}
-   - Midday meal helps maintain steady energy and prevents afternoon crashes
-
-3. **Dinner**:
-   - Should be 3-4 hours before bedtime to allow for digestion
-   - Ideal window: {dinner_start.strftime('%I:%M %p')} - {dinner_end.strftime('%I:%M %p')}
-   - Eating too close to bedtime can disrupt sleep quality
-
-4. **Snacks** (if needed):
-   - Between breakfast and lunch (mid-morning)
-   - Between lunch and dinner (afternoon)
-   - Should be 2-3 hours after main meals
-   - Only recommend if there are long gaps between meals
-
-5. **Timing Guidelines**:
-   - Space meals 4-6 hours apart for optimal digestion
-   - Avoid eating within 3 hours of bedtime
-   - Consider meal prep time and eating duration (typically 30-60 minutes)
-   - Account for buffer time before/after important events or meetings
-   - Factor in commute or preparation time if needed
-
-6. **Context Considerations**:
-   - Consider the intensity of events before/after potential meal times
-   - Leave buffer time if user has important meetings or activities
-   - Consider energy levels throughout the day
-   - Avoid scheduling meals during or immediately before/after intense activities
-
-**CRITICAL CONSTRAINTS**:
-
-1. **NO OVERLAPS WITH EVENTS**:
-   - You MUST NOT schedule any meal that overlaps with an existing calendar event
-   - Only suggest meal times that fall completely outside of scheduled events
-   - Check the schedule above carefully and ensure meal start/end times don't conflict with any events
-
-2. **MEAL TIMING PRIORITY** (strongly prefer better times):
-   - **ALWAYS recommend all three meals** (breakfast, lunch, dinner), but prioritize better timing
-   - **Breakfast**: STRONGLY prefer times between wake time and 10:00 AM. If that's not possible, find the earliest available slot before 12:00 PM
-   - **Lunch**: STRONGLY prefer times between 11:30 AM and 2:00 PM. If that's not possible, find the closest available slot (even if earlier or later)
-   - **Dinner**: STRONGLY prefer times between 5:30 PM and 8:00 PM (and at least 3 hours before bedtime). If that's not possible, find an available evening slot
-   - When the ideal window is blocked, choose the free slot that is CLOSEST in time to the ideal window
-   - Give higher priority_score (8-10) to meals in ideal windows, lower scores (4-7) to meals at suboptimal times
-
-3. **NO DUPLICATE MEALS**:
-   - CAREFULLY check the schedule above for any existing meal-related events
-   - Look for keywords like: breakfast, lunch, dinner, meal, snack, brunch, food, eat, dining, cafe, restaurant
-   - Examples of existing meals: "Breakfast with team", "Lunch meeting", "Team dinner", "Coffee and snacks", "Morning meal"
-   - If you see ANY event that indicates a meal is already scheduled, DO NOT recommend that meal type again
-   - For example:
-     * If you see "Breakfast with team" → DO NOT recommend breakfast
-     * If you see "Lunch meeting" → DO NOT recommend lunch
-     * If you see "Dinner at restaurant" → DO NOT recommend dinner
-   - Only recommend meals that are NOT already on the calendar
-   - If all three main meals (breakfast, lunch, dinner) are already scheduled, return an empty recommendations array with a summary like "All meals are already scheduled for this day"
-
-**TASK**: Based on the user's schedule above, wake time ({wake_time_str}), and bedtime ({sleep_time_str}), provide personalized meal window recommendations for {target_date.strftime('%A, %B %d, %Y')}.
-
-**IMPORTANT**: You MUST return ONLY valid JSON in this exact format (no markdown, no code blocks, just pure JSON):
+⏰ AVAILABLE SLOTS:
+{available_slots_text}
+🍽️ IDEAL MEAL WINDOWS:
+- Breakfast: {_fmt_ampm(breakfast_start)} - {_fmt_ampm(breakfast_end)}
+- Lunch: {_fmt_ampm(lunch_start)} - {_fmt_ampm(lunch_end)}
+- Dinner: {_fmt_ampm(dinner_start)} - {_fmt_ampm(dinner_end)}
 
-{{
-  "recommendations": [
-    {{
-      "type": "breakfast" or "lunch" or "dinner" or "snack",
-      "title": "Breakfast" or "Lunch" or "Dinner" or "Snack",
-      "start_time": "HH:MM" (24-hour format, e.g., "08:00"),
-      "duration_minutes": 30-60,
-      "reasoning": "Brief explanation of why this time works best",
-      "priority_score": 1-10 (higher is better, based on optimal timing and schedule fit)
-    }}
-  ],
-  "summary": "Brief overall explanation of recommendations"
-}}
+🍴 MEAL-RELATED EVENTS ALREADY ON THE CALENDAR:
+{existing_meals_json}
 
-Return meal recommendations for breakfast, lunch, and dinner (and snacks only if needed to fill gaps). Prioritize times that work with the user's schedule. All times should be in 24-hour format (HH:MM)."""
-        
-        # Get API key and set up Gemini client
-        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+**TASK**: Based on the user's schedule above, wake time ({wake_time_str}), and bedtime ({sleep_time_str}), provide personalized meal window recommendations for {_fmt_day(target_date)}."""
         
-        if not api_key:
-            return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found. Cannot calculate meal windows."})
-        
-        # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-        if not os.getenv('GOOGLE_API_KEY'):
-            os.environ['GOOGLE_API_KEY'] = api_key
-        
-        # Create Gemini client
-        client = genai.Client()
+        # Reuse the answer for an identical schedule if we already have one
+        cache_key = _schedule_cache_key('meal', day_events, sleep_time, wake_time, target_date)
+        gemini_response = _response_cache_get(cache_key)
+        fresh = gemini_response is None  # cached only once it has parsed into meal events
+
+        if gemini_response is None:
+            # Get API key and set up Gemini client
+            api_key = _get_api_key()
         
-        # List of models to try (prioritize models with available quota)
-        # Note: gemma models need -it suffix for instruction-tuned versions
-        models_to_try = [
-            'gemini-3-flash-preview',  # Has quota available
-            'gemini-2.0-flash-lite',  # Alternative flash model
-            'gemma-3-12b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-27b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-4b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-1b-it',  # 0/30 RPM (has quota!)
-            'gemini-2.5-flash',  # May be at quota limit
-            'gemini-2.5-flash-lite',  # May be over quota limit
-        ]
+            if not api_key:
+                return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found. Cannot calculate meal windows."})
         
-        last_error = None
-        gemini_response = None
+            # Reuse the shared Gemini client
+            client = _get_client()
+            models_to_try = _MODELS_TO_TRY
         
-        for model in models_to_try:
-            try:
-                print(f"[MEAL] Trying model {model}...", flush=True)
-                response = client.models.generate_content(
-                    model=model,
-                    contents=meal_prompt,
-                )
-                gemini_response = response.text
-                print(f"[MEAL] Model {model} succeeded!", flush=True)
-                break
-
-            except Exception as e:
-                error_str = str(e)
-                print(f"[MEAL] Model {model} error: {type(e).__name__}: {error_str[:300]}", flush=True)
-                # If it's a quota error, wait a bit and retry once
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                    print(f"Model {model} quota exceeded, waiting 2 seconds and retrying...", flush=True)
-                    time.sleep(2)
-                    try:
-                        response = client.models.generate_content(
-                            model=model,
-                            contents=meal_prompt,
-                        )
-                        gemini_response = response.text
-                        break
-                    except Exception as e2:
-                        last_error = e2
-                        print(f"Model {model} still failed after retry: {str(e2)[:200]}, trying next model...", flush=True)
-                        continue
-                # If it's a model not found error, try next model
-                elif '404' in error_str or 'NOT_FOUND' in error_str:
-                    last_error = e
-                    print(f"Model {model} not found: {error_str[:200]}, trying next model...", flush=True)
-                    continue
-                # If it's not a recoverable error, raise it immediately
-                else:
-                    raise
+            # Race the candidate models concurrently and take the first answer
+            gemini_response, last_error = _run_async(
+                _first_success(client, models_to_try, meal_prompt, system_instruction=MEAL_SYSTEM_INSTRUCTION)
+            )
 
-        # If all SDK models failed, try REST API as fallback
-        if not gemini_response:
-            print("All SDK models failed, trying REST API fallback...", flush=True)
-            gemini_response = _try_rest_api_fallback(api_key, meal_prompt, last_error)
+            # If all SDK models failed, try REST API as fallback
+            if not gemini_response:
+                print("All SDK models failed, trying REST API fallback...", flush=True)
+                gemini_response = _try_rest_api_fallback(api_key, meal_prompt, last_error,
+                                                         system_instruction=MEAL_SYSTEM_INSTRUCTION)
         
-        if not gemini_response:
-            raise Exception(f"All models exhausted (SDK and REST API). Last error: {last_error}")
+            if not gemini_response:
+                raise Exception(f"All models exhausted (SDK and REST API). Last error: {last_error}")
         
         # Parse Gemini's JSON response
         try:
             # Clean up the response - remove markdown code blocks if present
-            cleaned_response = gemini_response.strip()
-            if cleaned_response.startswith('```json'):
-                cleaned_response = cleaned_response[7:]
-            elif cleaned_response.startswith('```'):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith('```'):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            recommendations_data = json.loads(cleaned_response)
+            recommendations_data = _loads(_strip_markdown_fence(gemini_response))
             
             # Convert recommendations to calendar event format
             calendar_events = []
             recommendations = recommendations_data.get('recommendations', [])
             
-            # Sort by priority_score if available, otherwise keep order
-            if recommendations and 'priority_score' in recommendations[0]:
-                recommendations.sort(key=lambda x: x.get('priority_score', 0), reverse=True)
+            # Sort by priority_score (missing scores last); Gemini is asked to return
+            # them in this order already, which sort() verifies in a single pass
+            recommendations.sort(key=lambda x: x.get('priority_score', 0), reverse=True)
             
             for rec in recommendations:
                 start_time_str = rec.get('start_time', '')
@@ -919,13 +1529,13 @@ Return meal recommendations for breakfast, lunch, and dinner (and snacks only if
                 
                 # Parse time and create datetime objects
                 try:
-                    hour, minute = map(int, start_time_str.split(':'))
-                    start_dt = datetime.combine(target_date, datetime.min.time().replace(hour=hour, minute=minute))
+                    hour, minute = _parse_hhmm(start_time_str)
+                    start_dt = datetime(target_date.year, target_date.month, target_date.day, hour, minute)
                     end_dt = start_dt + timedelta(minutes=duration)
                     
-                    # Format as ISO 8601 with timezone (Pacific Time)
-                    start_iso = start_dt.strftime('%Y-%m-%dT%H:%M:%S-08:00')
-                    end_iso = end_dt.strftime('%Y-%m-%dT%H:%M:%S-08:00')
+                    # Format as ISO 8601 with the Pacific Time offset (PST or PDT)
+                    start_iso = start_dt.replace(tzinfo=_PACIFIC_TZ).isoformat(timespec='seconds')
+                    end_iso = end_dt.replace(tzinfo=_PACIFIC_TZ).isoformat(timespec='seconds')
                     
                     # Create calendar event in Google Calendar format
                     # These are suggested events for frontend display - user will choose which to keep
@@ -953,13 +1563,18 @@ Return meal recommendations for breakfast, lunch, and dinner (and snacks only if
                 except (ValueError, AttributeError) as e:
                     # Skip invalid time formats
                     continue
+
+            # Only a response that produced events is worth serving again
+            if fresh and calendar_events:
+                _response_cache_put(cache_key, gemini_response)
             
-            # Return JSON array of calendar events
+            # Return JSON array of calendar events (compact unless MEAL_PRETTY_JSON=1 for debugging)
+            pretty = os.getenv('MEAL_PRETTY_JSON') == '1'
             return json.dumps({
                 "events": calendar_events,
                 "summary": recommendations_data.get('summary', ''),
                 "count": len(calendar_events)
-            }, indent=2)
+            }, indent=2 if pretty else None, separators=None if pretty else (',', ':'))
             
         except json.JSONDecodeError as e:
             # If JSON parsing fails, return error with raw response for debugging
@@ -1004,82 +1619,64 @@ def predict_burnout_tool(date_str: str, user_id: str = 'default_user',
         
         # Events provided from MongoDB via Node.js API
         all_events = provided_events
-        day_events = []
-        week_events = []
-        
+        parsed = []
+
         # Process events (works for both MongoDB and JSON formats)
         for event in all_events:
             # Handle both MongoDB format (startISO) and Google Calendar format (start.dateTime)
-            startISO = event.get('startISO')
-            if not startISO:
-                start_data = event.get('start', {})
-                if isinstance(start_data, dict):
-                    startISO = start_data.get('dateTime') or start_data.get('date')
-                else:
-                    startISO = str(start_data) if start_data else None
+            startISO, endISO = _extract_times(event)
             
             if startISO:
                 try:
-                    dt_str = startISO
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str[:-1] + '+00:00'
-                    event_dt = datetime.fromisoformat(dt_str)
-                    if event_dt.tzinfo:
-                        event_dt = event_dt.astimezone().replace(tzinfo=None)
-                    
-                    event_date = event_dt.date()
+                    event_dt = _parse_local(startISO)
                     
                     # Calculate end time for all events
-                    endISO = event.get('endISO')
-                    if not endISO:
-                        end_data = event.get('end', {})
-                        if isinstance(end_data, dict):
-                            endISO = end_data.get('dateTime') or end_data.get('date')
-                        else:
-                            endISO = str(end_data) if end_data else None
-                    
                     if endISO:
                         if isinstance(endISO, str):
-                            if endISO.endswith('Z'):
-                                endISO = endISO[:-1] + '+00:00'
-                            event_end = datetime.fromisoformat(endISO)
-                            if event_end.tzinfo:
-                                event_end = event_end.astimezone().replace(tzinfo=None)
+                            event_end = _parse_local(endISO)
                         else:
                             event_end = event_dt + timedelta(hours=1)
                     else:
                         event_end = event_dt + timedelta(hours=1)
                     
-                    # Check if event is on target date
-                    if event_date == target_date:
-                        day_events.append({
-                            'title': event.get('title') or event.get('summary', 'Event'),
-                            'start': event_dt,
-                            'end': event_end,
-                            'description': event.get('description', '')
-                        })
-                    
-                    # Also collect events from 3 days before to 3 days after for context
-                    days_from_target = (event_date - target_date).days
-                    if -3 <= days_from_target <= 3:
-                        week_events.append({
-                            'title': event.get('title') or event.get('summary', 'Event'),
-                            'date': event_date,
-                            'start': event_dt,
-                            'end': event_end
-                        })
+                    parsed.append((event, event_dt, event_end))
                 except (ValueError, AttributeError):
                     continue
         
-        # Sort events by start time
-        day_events.sort(key=lambda x: x['start'])
-        week_events.sort(key=lambda x: (x['date'], x['start']))
+        # Sort once by start time, then slice out the target day and the
+        # surrounding week (3 days before to 3 days after) with bisect
+        parsed.sort(key=itemgetter(1))
+        start_keys = [p[1] for p in parsed]
+        t_day_lo = datetime.combine(target_date, datetime.min.time())
+        t_lo = t_day_lo - timedelta(days=3)
+        t_hi = t_day_lo + timedelta(days=4)
+        week_lo = bisect.bisect_left(start_keys, t_lo)
+        week_hi = bisect.bisect_left(start_keys, t_hi, week_lo)
+        day_lo = bisect.bisect_left(start_keys, t_day_lo, week_lo, week_hi)
+        day_hi = bisect.bisect_left(start_keys, t_day_lo + timedelta(days=1), day_lo, week_hi)
+
+        day_events = []
+        for event, event_dt, event_end in parsed[day_lo:day_hi]:
+            title, description = _norm(event)
+            day_events.append({
+                'title': title,
+                'start': event_dt,
+                'end': event_end,
+                'description': description
+            })
+
+        week_events = [{
+            'title': _norm(event)[0],
+            'date': event_dt.date(),
+            'start': event_dt,
+            'end': event_end
+        } for event, event_dt, event_end in parsed[week_lo:week_hi]]
 
         # Calculate schedule metrics for context
-        total_hours = 0
         num_events = len(day_events)
-        back_to_back_count = 0
-        short_gaps = 0
+        durations_h, total_hours, back_to_back_count, short_gaps = _schedule_metrics(
+            [e['start'] for e in day_events], [e['end'] for e in day_events]
+        )
         earliest_start = None
         latest_end = None
 
@@ -1087,74 +1684,60 @@ def predict_burnout_tool(date_str: str, user_id: str = 'default_user',
             earliest_start = day_events[0]['start']
             latest_end = day_events[-1]['end']
 
-            for i, event in enumerate(day_events):
-                duration = (event['end'] - event['start']).total_seconds() / 3600
-                total_hours += duration
-
-                if i < len(day_events) - 1:
-                    gap = (day_events[i + 1]['start'] - event['end']).total_seconds() / 60
-                    if gap <= 15:
-                        back_to_back_count += 1
-                    elif gap < 30:
-                        short_gaps += 1
-
         # Format schedule for Gemini prompt
-        schedule_text = ""
         if day_events:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\n\n"
-            for event in day_events:
-                start_time = event['start'].strftime('%I:%M %p')
-                end_time = event['end'].strftime('%I:%M %p')
-                duration = (event['end'] - event['start']).total_seconds() / 3600
-                schedule_text += f"• {start_time} - {end_time}: {event['title']} ({duration:.1f}h)\n"
-
-            schedule_text += f"\n📊 SCHEDULE METRICS:\n"
-            schedule_text += f"- Total events: {num_events}\n"
-            schedule_text += f"- Total scheduled time: {total_hours:.1f} hours\n"
-            schedule_text += f"- Back-to-back events (≤15 min gap): {back_to_back_count}\n"
-            schedule_text += f"- Short breaks (<30 min gap): {short_gaps}\n"
+            parts = [f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\n\n"]
+            _append = parts.append
+            for event, duration in zip(day_events, durations_h):
+                start_time = _fmt_ampm(event['start'])
+                end_time = _fmt_ampm(event['end'])
+                _append(f"• {start_time} - {end_time}: {event['title']} ({duration:.1f}h)\n")
+
+            _append(f"\n📊 SCHEDULE METRICS:\n")
+            _append(f"- Total events: {num_events}\n")
+            _append(f"- Total scheduled time: {total_hours:.1f} hours\n")
+            _append(f"- Back-to-back events (≤15 min gap): {back_to_back_count}\n")
+            _append(f"- Short breaks (<30 min gap): {short_gaps}\n")
             if earliest_start:
-                schedule_text += f"- First event starts: {earliest_start.strftime('%I:%M %p')}\n"
+                _append(f"- First event starts: {_fmt_ampm(earliest_start)}\n")
             if latest_end:
-                schedule_text += f"- Last event ends: {latest_end.strftime('%I:%M %p')}\n"
+                _append(f"- Last event ends: {_fmt_ampm(latest_end)}\n")
             if earliest_start and latest_end:
                 day_span = (latest_end - earliest_start).total_seconds() / 3600
-                schedule_text += f"- Day span: {day_span:.1f} hours\n"
+                _append(f"- Day span: {day_span:.1f} hours\n")
+            schedule_text = "".join(parts)
         else:
-            schedule_text = f"\n\n📅 SCHEDULE FOR {target_date.strftime('%A, %B %d, %Y')}:\nNo events scheduled for this day.\n"
+            schedule_text = f"\n\n📅 SCHEDULE FOR {_fmt_day(target_date)}:\nNo events scheduled for this day.\n"
         
         # Format week context
         week_context = ""
         if week_events:
-            week_context = "\n\n📊 WEEK CONTEXT (3 days before and after):\n\n"
-            events_by_date = {}
+            events_by_date = defaultdict(list)
             for event in week_events:
-                date_key = event['date'].isoformat()
-                if date_key not in events_by_date:
-                    events_by_date[date_key] = []
-                events_by_date[date_key].append(event)
+                events_by_date[event['date']].append(event)
             
-            for date_key in sorted(events_by_date.keys()):
-                date_obj = datetime.fromisoformat(date_key).date()
-                events = events_by_date[date_key]
-                week_context += f"{date_obj.strftime('%A, %B %d')}: {len(events)} events\n"
+            parts = ["\n\n📊 WEEK CONTEXT (3 days before and after):\n\n"]
+            _append = parts.append
+            for date_obj in sorted(events_by_date):
+                events = events_by_date[date_obj]
+                _append(f"{_fmt_day(date_obj, with_year=False)}: {len(events)} events\n")
+            week_context = "".join(parts)
         
         # Parse sleep and wake times
+        year, month, day = target_date.year, target_date.month, target_date.day
         try:
-            sleep_hour, sleep_minute = map(int, sleep_time.split(':'))
-            wake_hour, wake_minute = map(int, wake_time.split(':'))
-            sleep_time_obj = datetime.min.time().replace(hour=sleep_hour, minute=sleep_minute)
-            wake_time_obj = datetime.min.time().replace(hour=wake_hour, minute=wake_minute)
+            sleep_hour, sleep_minute = _parse_hhmm(sleep_time)
+            wake_hour, wake_minute = _parse_hhmm(wake_time)
+            sleep_dt = datetime(year, month, day, sleep_hour, sleep_minute)
+            wake_dt = datetime(year, month, day, wake_hour, wake_minute)
         except (ValueError, AttributeError):
-            sleep_time_obj = datetime.min.time().replace(hour=0, minute=0)
-            wake_time_obj = datetime.min.time().replace(hour=8, minute=0)
+            sleep_dt = datetime(year, month, day, 0, 0)
+            wake_dt = datetime(year, month, day, 8, 0)
         
-        sleep_time_str = sleep_time_obj.strftime('%I:%M %p')
-        wake_time_str = wake_time_obj.strftime('%I:%M %p')
+        sleep_time_str = _fmt_ampm(sleep_dt)
+        wake_time_str = _fmt_ampm(wake_dt)
         
         # Calculate sleep duration
-        sleep_dt = datetime.combine(target_date, sleep_time_obj)
-        wake_dt = datetime.combine(target_date, wake_time_obj)
         if wake_dt < sleep_dt:
             wake_dt += timedelta(days=1)
         sleep_duration = (wake_dt - sleep_dt).total_seconds() / 3600
@@ -1218,112 +1801,63 @@ Return ONLY valid JSON (no markdown, no code blocks):
   "reasoning": "Explain your score based on the specific events and schedule density",
   "key_factors": ["factor1", "factor2", "factor3"],
   "recommendations": ["recommendation1", "recommendation2"]
-}}"""
-        
-        # Get API key and set up Gemini client
-        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
-        
-        if not api_key:
-            return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found"})
-        
-        # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-        if not os.getenv('GOOGLE_API_KEY'):
-            os.environ['GOOGLE_API_KEY'] = api_key
-        
-        # Create Gemini client
-        client = genai.Client()
-        
-        # List of models to try (prioritize models with available quota)
-        # Note: gemma models need -it suffix for instruction-tuned versions
-        models_to_try = [
-            'gemini-3-flash-preview',  # Has quota available
-            'gemini-2.0-flash-lite',  # Alternative flash model
-            'gemma-3-12b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-27b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-4b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-1b-it',  # 0/30 RPM (has quota!)
-            'gemini-2.5-flash',  # May be at quota limit
-            'gemini-2.5-flash-lite',  # May be over quota limit
-        ]
-        
-        last_error = None
-        gemini_response = None
-        
-        for model in models_to_try:
-            try:
-                response = client.models.generate_content(
-                    model=model,
-                    contents=burnout_prompt,
-                )
-                gemini_response = response.text
-                break
-                
-            except Exception as e:
-                error_str = str(e)
-                # If it's a quota error, wait a bit and retry once
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                    print(f"Model {model} quota exceeded, waiting 2 seconds and retrying...", flush=True)
-                    time.sleep(2)
-                    try:
-                        response = client.models.generate_content(
-                            model=model,
-                            contents=burnout_prompt,
-                        )
-                        gemini_response = response.text
-                        break
-                    except Exception as e2:
-                        last_error = e2
-                        print(f"Model {model} still failed after retry: {str(e2)[:200]}, trying next model...", flush=True)
-                        continue
-                # If it's a model not found error, try next model
-                elif '404' in error_str or 'NOT_FOUND' in error_str:
-                    last_error = e
-                    print(f"Model {model} not found: {error_str[:200]}, trying next model...", flush=True)
-                    continue
-                # If it's not a recoverable error, raise it immediately
-                else:
-                    raise
+}}"""
         
-        # If all SDK models failed, try REST API as fallback
-        if not gemini_response:
-            print("All SDK models failed, trying REST API fallback...", flush=True)
-            gemini_response = _try_rest_api_fallback(api_key, burnout_prompt, last_error)
+        # Reuse the answer for an identical schedule if we already have one
+        cache_key = _schedule_cache_key('burnout', day_events + week_events, sleep_time, wake_time, target_date)
+        gemini_response = _response_cache_get(cache_key)
+        fresh = False  # set for a model answer, which is cached once it parses with a score
+
+        if gemini_response is None:
+            # Get API key and set up Gemini client
+            api_key = _get_api_key()
         
-        if not gemini_response:
-            raise Exception(f"All models exhausted (SDK and REST API). Last error: {last_error}")
+            if not api_key:
+                return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found"})
+        
+            # Reuse the shared Gemini client
+            client = _get_client()
+            models_to_try = _MODELS_TO_TRY
+        
+            # Race the candidate models concurrently and take the first answer
+            gemini_response, last_error = _run_async(_first_success(client, models_to_try, burnout_prompt))
+        
+            # If all SDK models failed, try REST API as fallback
+            if not gemini_response:
+                print("All SDK models failed, trying REST API fallback...", flush=True)
+                gemini_response = _try_rest_api_fallback(api_key, burnout_prompt, last_error)
+        
+            if not gemini_response:
+                # Keep working through an outage with the offline estimate (not cached)
+                print(f"All models exhausted (SDK and REST API), using local burnout score. Last error: {last_error}", flush=True)
+                gemini_response = json.dumps(_local_burnout_score(
+                    [e['start'] for e in day_events], [e['end'] for e in day_events], sleep_duration
+                ))
+            else:
+                fresh = True
         
         # Parse Gemini's JSON response
         try:
             # Clean up the response - remove markdown code blocks if present
-            cleaned_response = gemini_response.strip()
-            if cleaned_response.startswith('```json'):
-                cleaned_response = cleaned_response[7:]
-            elif cleaned_response.startswith('```'):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith('```'):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            prediction_data = json.loads(cleaned_response)
+            prediction_data = _loads(_strip_markdown_fence(gemini_response))
 
             # Validate and ensure score is in range
             score = prediction_data.get('score', 50)
+            valid_score = 'score' in prediction_data
             if not isinstance(score, int):
                 try:
                     score = int(float(score))
                 except (ValueError, TypeError):
                     score = 50
+                    valid_score = False
             score = max(0, min(100, score))
 
             # Ensure status matches the score
-            if score <= 30:
-                status = 'stable'
-            elif score <= 50:
-                status = 'building'
-            elif score <= 70:
-                status = 'high-risk'
-            else:
-                status = 'critical'
+            status = _STATUS_TABLE[score]
+
+            # Only a parsed answer with a usable score is worth serving again
+            if fresh and valid_score:
+                _response_cache_put(cache_key, gemini_response)
             
             return json.dumps({
                 "score": score,
@@ -1361,17 +1895,11 @@ def predict_burnout_batch_tool(user_id: str = 'default_user',
     """
     try:
         today = datetime.now().date()
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        user_calendars_path = os.path.join(script_dir, 'user_data', f'{user_id}_calendars.json')
+        user_calendars_path = _user_path(user_id, 'calendars.json')
         
         # Get events for the next N days
-        date_range = []
-        events_by_date = {}
-        
-        for i in range(days_ahead):
-            target_date = today + timedelta(days=i)
-            date_range.append(target_date)
-            events_by_date[target_date] = []
+        date_range = [today + timedelta(days=i) for i in range(days_ahead)]
+        window_end = today + timedelta(days=days_ahead)
         
         # Require events from MongoDB via Node.js API
         if not provided_events:
@@ -1379,60 +1907,40 @@ def predict_burnout_batch_tool(user_id: str = 'default_user',
         
         # Events provided from MongoDB via Node.js API
         all_events = provided_events
+        parsed = []  # (start, end, title) for events inside the window
         
         # Process events (works for both MongoDB and JSON formats)
         for event in all_events:
             # Handle both MongoDB format (startISO) and Google Calendar format (start.dateTime)
-            startISO = event.get('startISO')
-            if not startISO:
-                start_data = event.get('start', {})
-                if isinstance(start_data, dict):
-                    startISO = start_data.get('dateTime') or start_data.get('date')
-                else:
-                    startISO = str(start_data) if start_data else None
+            startISO, endISO = _extract_times(event)
             
             if startISO:
                 try:
-                    dt_str = startISO
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str[:-1] + '+00:00'
-                    event_dt = datetime.fromisoformat(dt_str)
-                    if event_dt.tzinfo:
-                        event_dt = event_dt.astimezone().replace(tzinfo=None)
+                    event_dt = _parse_local(startISO)
                     
                     event_date = event_dt.date()
                     
-                    if event_date in events_by_date:
+                    if today <= event_date < window_end:
                         # Parse end time
-                        endISO = event.get('endISO')
-                        if not endISO:
-                            end_data = event.get('end', {})
-                            if isinstance(end_data, dict):
-                                endISO = end_data.get('dateTime') or end_data.get('date')
-                            else:
-                                endISO = str(end_data) if end_data else None
-                        
                         if endISO:
                             if isinstance(endISO, str):
-                                if endISO.endswith('Z'):
-                                    endISO = endISO[:-1] + '+00:00'
-                                event_end = datetime.fromisoformat(endISO)
-                                if event_end.tzinfo:
-                                    event_end = event_end.astimezone().replace(tzinfo=None)
+                                event_end = _parse_local(endISO)
                             else:
                                 event_end = event_dt + timedelta(hours=1)
                         else:
                             event_end = event_dt + timedelta(hours=1)
                         
-                        events_by_date[event_date].append({
-                            'title': event.get('title') or event.get('summary', 'Event'),
-                            'start': event_dt,
-                            'end': event_end,
-                            'description': event.get('description', '')
-                        })
+                        parsed.append((event_dt, event_end, _norm(event)[0]))
                 except (ValueError, AttributeError):
                     continue
         
+        # Sort once and keep the events as parallel start/end/title columns;
+        # each day is then a slice found by bisecting the start column
+        parsed.sort(key=itemgetter(0))
+        starts = [p[0] for p in parsed]
+        ends = [p[1] for p in parsed]
+        titles = [p[2] for p in parsed]
+        
         # Load previous burnout scores from cache for historical context
         previous_cache = load_burnout_cache(user_id=user_id)
         historical_context = ""
@@ -1453,75 +1961,68 @@ def predict_burnout_batch_tool(user_id: str = 'default_user',
         if recent_scores:
             # Sort by date (oldest first)
             recent_scores.sort(key=lambda x: x['date'])
-            historical_context = "\n\n📊 RECENT BURNOUT HISTORY (Last 7 Days):\n"
+            parts = ["\n\n📊 RECENT BURNOUT HISTORY (Last 7 Days):\n"]
+            _append = parts.append
             for score_data in recent_scores:
                 date_obj = datetime.fromisoformat(score_data['date']).date()
-                historical_context += f"  • {date_obj.strftime('%A, %B %d')}: Score {score_data['score']}/100 ({score_data['status']})\n"
+                _append(f"  • {_fmt_day(date_obj, with_year=False)}: Score {score_data['score']}/100 ({score_data['status']})\n")
             
             # Calculate average recent burnout
             avg_recent = sum(s['score'] for s in recent_scores) / len(recent_scores)
-            historical_context += f"\n  Average recent burnout: {avg_recent:.1f}/100\n"
+            _append(f"\n  Average recent burnout: {avg_recent:.1f}/100\n")
+            historical_context = "".join(parts)
         
         # Format schedules for all days
-        schedules_text = ""
+        parts = []
+        _append = parts.append
+        day_bounds = []  # (date, lo, hi) slice of the event columns for each day
+        hi = 0
         for target_date in date_range:
-            day_events = events_by_date[target_date]
-            day_events.sort(key=lambda x: x['start'])
+            day_start = datetime.combine(target_date, datetime.min.time())
+            lo = bisect.bisect_left(starts, day_start, hi)
+            hi = bisect.bisect_left(starts, day_start + timedelta(days=1), lo)
+            day_bounds.append((target_date, lo, hi))
+            day_starts = starts[lo:hi]
+            day_ends = ends[lo:hi]
 
             # Calculate metrics for context
-            total_hours = 0
-            num_events = len(day_events)
-            back_to_back_count = 0
-            short_gaps = 0
+            num_events = hi - lo
+            durations_h, total_hours, back_to_back_count, short_gaps = _schedule_metrics(day_starts, day_ends)
             earliest_start = None
             latest_end = None
 
-            if day_events:
-                earliest_start = day_events[0]['start']
-                latest_end = day_events[-1]['end']
-
-                for i, event in enumerate(day_events):
-                    duration = (event['end'] - event['start']).total_seconds() / 3600
-                    total_hours += duration
-
-                    if i < len(day_events) - 1:
-                        gap = (day_events[i + 1]['start'] - event['end']).total_seconds() / 60
-                        if gap <= 15:
-                            back_to_back_count += 1
-                        elif gap < 30:
-                            short_gaps += 1
+            if num_events:
+                earliest_start = day_starts[0]
+                latest_end = day_ends[-1]
 
             # Format schedule text
-            if day_events:
-                schedules_text += f"\n\n📅 {target_date.strftime('%A, %B %d, %Y')}:\n"
-                for event in day_events:
-                    start_time = event['start'].strftime('%I:%M %p')
-                    end_time = event['end'].strftime('%I:%M %p')
-                    duration = (event['end'] - event['start']).total_seconds() / 3600
-                    schedules_text += f"  • {start_time} - {end_time}: {event['title']} ({duration:.1f}h)\n"
-                schedules_text += f"  📊 Metrics: {num_events} events, {total_hours:.1f}h total, {back_to_back_count} back-to-back\n"
+            if num_events:
+                _append(f"\n\n📅 {_fmt_day(target_date)}:\n")
+                for title, start, end, duration in zip(titles[lo:hi], day_starts, day_ends, durations_h):
+                    _append(f"  • {_fmt_ampm(start)} - {_fmt_ampm(end)}: {title} ({duration:.1f}h)\n")
+                _append(f"  📊 Metrics: {num_events} events, {total_hours:.1f}h total, {back_to_back_count} back-to-back\n")
                 if earliest_start and latest_end:
                     day_span = (latest_end - earliest_start).total_seconds() / 3600
-                    schedules_text += f"  📊 Day span: {earliest_start.strftime('%I:%M %p')} - {latest_end.strftime('%I:%M %p')} ({day_span:.1f}h)\n"
+                    _append(f"  📊 Day span: {_fmt_ampm(earliest_start)} - {_fmt_ampm(latest_end)} ({day_span:.1f}h)\n")
             else:
-                schedules_text += f"\n\n📅 {target_date.strftime('%A, %B %d, %Y')}:\n  No events scheduled\n"
+                _append(f"\n\n📅 {_fmt_day(target_date)}:\n  No events scheduled\n")
+        schedules_text = "".join(parts)
         
         # Parse sleep and wake times
+        year, month, day = today.year, today.month, today.day
         try:
-            sleep_hour, sleep_minute = map(int, sleep_time.split(':'))
-            wake_hour, wake_minute = map(int, wake_time.split(':'))
-            sleep_time_obj = datetime.min.time().replace(hour=sleep_hour, minute=sleep_minute)
-            wake_time_obj = datetime.min.time().replace(hour=wake_hour, minute=wake_minute)
+            sleep_hour, sleep_minute = _parse_hhmm(sleep_time)
+            wake_hour, wake_minute = _parse_hhmm(wake_time)
+            sleep_dt = datetime(year, month, day, sleep_hour, sleep_minute)
+            wake_dt = datetime(year, month, day, wake_hour, wake_minute)
         except (ValueError, AttributeError):
-            sleep_time_obj = datetime.min.time().replace(hour=0, minute=0)
-            wake_time_obj = datetime.min.time().replace(hour=8, minute=0)
+            sleep_dt = datetime(year, month, day, 0, 0)
+            wake_dt = datetime(year, month, day, 8, 0)
         
-        sleep_time_str = sleep_time_obj.strftime('%I:%M %p')
-        wake_time_str = wake_time_obj.strftime('%I:%M %p')
+        sleep_time_str = _fmt_ampm(sleep_dt)
+        wake_time_str = _fmt_ampm(wake_dt)
         
         # Calculate sleep duration
-        sleep_dt = datetime.combine(today, sleep_time_obj)
-        wake_dt = datetime.combine(today, wake_time_obj)
         if wake_dt < sleep_dt:
             wake_dt += timedelta(days=1)
         sleep_duration = (wake_dt - sleep_dt).total_seconds() / 3600
@@ -1538,146 +2039,61 @@ def predict_burnout_batch_tool(user_id: str = 'default_user',
 - Wake time: {wake_time_str}
 - Sleep duration: {sleep_duration:.1f} hours
 
-🧠 ANALYZE EACH DAY'S SCHEDULE AND DETERMINE BURNOUT RISK:
-
-Consider these factors when scoring each day:
-
-1. **Schedule Density** - How packed is the day?
-   - Back-to-back events with no breaks are exhausting
-   - Long spans (8+ hours) from first to last event increase fatigue
-   - Many events = more cognitive load and transitions
-
-2. **Event Types** - What kind of activities?
-   - High-stakes (exams, presentations, interviews, deadlines) = HIGH stress
-   - Regular classes/meetings = MODERATE stress
-   - Meals, breaks, naps = RESTORATIVE (reduce stress)
-   - Social activities, exercise, hobbies = can be RESTORATIVE or neutral
-
-3. **Sleep Quality**
-   - <6 hours = significantly increased burnout risk
-   - 6-7 hours = somewhat elevated risk
-   - 7-8 hours = optimal
-   - >8 hours = well-rested
-
-4. **Cumulative Effects**
-   - Consecutive high-stress days compound fatigue
-   - Rest days help recovery
-   - Consider the week's pattern, not just each day in isolation
-
-📊 SCORING SCALE (0-100):
-- 0-25: Very low risk - light day, plenty of breaks, restorative activities
-- 26-40: Low risk - manageable schedule, some commitments but balanced
-- 41-55: Moderate risk - busy day, limited breaks, building stress
-- 56-70: High risk - packed schedule, back-to-back events, limited recovery
-- 71-85: Very high risk - overwhelming schedule, multiple high-stakes events
-- 86-100: Critical - unsustainable, immediate intervention needed
-
-**IMPORTANT**:
-- A day with 5+ back-to-back classes/meetings is NOT "low risk"
-- Meals and naps scheduled in gaps are GOOD - they reduce the score
-- Look at the ACTUAL event names to determine if they're stressful or restorative
-- Empty days or days with only 1-2 events should score LOW (under 30)
+{_BURNOUT_PROMPT_RULES}
 
-Return ONLY valid JSON (no markdown, no code blocks):
-
-{{
-  "predictions": [
-    {{
-      "date": "YYYY-MM-DD",
-      "score": 0-100 (integer),
-      "status": "stable" or "building" or "high-risk" or "critical",
-      "reasoning": "Brief explanation based on specific events"
-    }}
-  ]
-}}
+{_BURNOUT_PROMPT_SCHEMA}
 
 Return predictions for ALL {days_ahead} days in chronological order."""
         
+        # Offline estimate for every day, used for an empty window or when every model fails
+        past_scores = [r['score'] for r in recent_scores]
+        local_response = json.dumps({"predictions": [
+            {"date": target_date.isoformat(),
+             **_local_burnout_score(starts[lo:hi], ends[lo:hi], sleep_duration, past_scores)}
+            for target_date, lo, hi in day_bounds
+        ]})
+        
         # Get API key and set up Gemini client
-        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+        api_key = _get_api_key()
         
-        if not api_key:
+        if not api_key and starts:
             return json.dumps({"error": "GOOGLE_API_KEY or GEMINI_API_KEY not found. Cannot predict burnout."})
         
-        # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-        if not os.getenv('GOOGLE_API_KEY'):
-            os.environ['GOOGLE_API_KEY'] = api_key
-        
-        # Create Gemini client
-        client = genai.Client()
-        
-        # List of models to try (prioritize models with available quota)
-        # Note: gemma models need -it suffix for instruction-tuned versions
-        models_to_try = [
-            'gemini-3-flash-preview',  # Has quota available
-            'gemini-2.0-flash-lite',  # Alternative flash model
-            'gemma-3-12b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-27b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-4b-it',  # 0/30 RPM (has quota!)
-            'gemma-3-1b-it',  # 0/30 RPM (has quota!)
-            'gemini-2.5-flash',  # May be at quota limit
-            'gemini-2.5-flash-lite',  # May be over quota limit
-        ]
-        
+        models_to_try = _MODELS_TO_TRY
         last_error = None
-        gemini_response = None
-        
-        for model in models_to_try:
-            try:
-                response = client.models.generate_content(
-                    model=model,
-                    contents=burnout_prompt,
-                )
-                gemini_response = response.text
-                break
-                
-            except Exception as e:
-                error_str = str(e)
-                # If it's a quota error, wait a bit and retry once
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                    print(f"Model {model} quota exceeded, waiting 2 seconds and retrying...", flush=True)
-                    time.sleep(2)
-                    try:
-                        response = client.models.generate_content(
-                            model=model,
-                            contents=burnout_prompt,
-                        )
-                        gemini_response = response.text
-                        break
-                    except Exception as e2:
-                        last_error = e2
-                        print(f"Model {model} still failed after retry: {str(e2)[:200]}, trying next model...", flush=True)
-                        continue
-                # If it's a model not found error, try next model
-                elif '404' in error_str or 'NOT_FOUND' in error_str:
-                    last_error = e
-                    print(f"Model {model} not found: {error_str[:200]}, trying next model...", flush=True)
-                    continue
-                # If it's not a recoverable error, raise it immediately
-                else:
-                    raise
+        cache_key = LLMCache.make_key(models_to_try, burnout_prompt)
+        gemini_response = _LLM_CACHE.get(cache_key, ttl=_LLM_CACHE_TTL) if starts else None
+        fresh = False  # set for a model answer, which is cached once its predictions validate
+        
+        if not starts:
+            # Nothing scheduled in the whole window - no need to ask Gemini
+            print("No events in the next days, using local burnout scores", flush=True)
+            gemini_response = local_response
+        elif gemini_response is None:
+            # Reuse the shared Gemini client
+            client = _get_client()
+            
+            # Race the candidate models concurrently and take the first answer
+            gemini_response, last_error = _run_async(
+                _first_success(client, models_to_try, burnout_prompt, timeout=60)
+            )
         
-        # If all SDK models failed, try REST API as fallback
-        if not gemini_response:
-            print("All SDK models failed, trying REST API fallback...", flush=True)
-            gemini_response = _try_rest_api_fallback(api_key, burnout_prompt, last_error)
+            # If all SDK models failed, try REST API as fallback
+            if not gemini_response:
+                print("All SDK models failed, trying REST API fallback...", flush=True)
+                gemini_response = _try_rest_api_fallback(api_key, burnout_prompt, last_error)
         
-        if not gemini_response:
-            raise Exception(f"All models exhausted (SDK and REST API). Last error: {last_error}")
+            if not gemini_response:
+                # Keep working through an outage with the offline estimate (not cached)
+                print(f"All models exhausted (SDK and REST API), using local burnout scores. Last error: {last_error}", flush=True)
+                gemini_response = local_response
+            else:
+                fresh = True
         
         # Parse Gemini's JSON response
         try:
             # Clean up the response - remove markdown code blocks if present
-            cleaned_response = gemini_response.strip()
-            if cleaned_response.startswith('```json'):
-                cleaned_response = cleaned_response[7:]
-            elif cleaned_response.startswith('```'):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith('```'):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-            
-            prediction_data = json.loads(cleaned_response)
+            prediction_data = _loads(_strip_markdown_fence(gemini_response))
             predictions = prediction_data.get('predictions', [])
 
             # Validate and process predictions
@@ -1696,23 +2112,20 @@ Return predictions for ALL {days_ahead} days in chronological order."""
                 score = max(0, min(100, score))
 
                 # Ensure status matches the score
-                if score <= 30:
-                    status = 'stable'
-                elif score <= 50:
-                    status = 'building'
-                elif score <= 70:
-                    status = 'high-risk'
-                else:
-                    status = 'critical'
+                status = _STATUS_TABLE[score]
 
                 validated_predictions[date_str] = {
                     'score': score,
                     'status': status,
                     'reasoning': pred.get('reasoning', '')
                 }
+
+            # Keep the raw answer for identical prompts only if it yielded predictions
+            if fresh and validated_predictions:
+                _LLM_CACHE.put(cache_key, gemini_response, ttl=_LLM_CACHE_TTL)
             
             # Save to cache
-            cache_path = os.path.join(script_dir, 'user_data', f'{user_id}_burnout_cache.json')
+            cache_path = _user_path(user_id, 'burnout_cache.json')
             cache_data = {
                 'user_id': user_id,
                 'cached_at': datetime.now().isoformat(),
@@ -1721,8 +2134,13 @@ Return predictions for ALL {days_ahead} days in chronological order."""
                 'predictions': validated_predictions
             }
             
-            with open(cache_path, 'w') as f:
+            # Write to a temp file and swap it in so readers never see a partial file
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'w') as f:
                 json.dump(cache_data, f, indent=2)
+            os.replace(tmp_path, cache_path)
+            st = os.stat(cache_path)
+            _BURNOUT_CACHE_MEM[cache_path] = ((st.st_mtime_ns, st.st_size), validated_predictions)
             
             return json.dumps({
                 "success": True,
@@ -1742,26 +2160,76 @@ Return predictions for ALL {days_ahead} days in chronological order."""
         return json.dumps({"error": f"Error predicting burnout batch: {str(e)}"})
 
 
+# Parsed burnout cache files: cache_path -> ((mtime_ns, size), predictions)
+_BURNOUT_CACHE_MEM = {}
+
+
 def load_burnout_cache(user_id: str = 'default_user') -> dict:
     """Load cached burnout predictions
 
+    The parsed file is kept in memory and only re-read when its mtime or size changes.
+    Callers get their own copy of the date -> prediction mapping; the per-date
+    prediction dicts are shared with the in-memory copy and must not be modified.
+
     Returns:
         Dictionary with cached predictions, or empty dict if cache doesn't exist
     """
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        cache_path = os.path.join(script_dir, 'user_data', f'{user_id}_burnout_cache.json')
+        cache_path = _user_path(user_id, 'burnout_cache.json')
 
-        if os.path.exists(cache_path):
-            with open(cache_path, 'r') as f:
-                cache_data = json.load(f)
-                return cache_data.get('predictions', {})
-        return {}
+        try:
+            st = os.stat(cache_path)
+        except FileNotFoundError:
+            return {}
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = _BURNOUT_CACHE_MEM.get(cache_path)
+        if cached and cached[0] == stamp:
+            return dict(cached[1])
+
+        with open(cache_path, 'rb') as f:
+            cache_data = _loads(f.read())
+        predictions = cache_data.get('predictions', {})
+        _BURNOUT_CACHE_MEM[cache_path] = (stamp, predictions)
+        return dict(predictions)
     except Exception as e:
         print(f"Warning: Could not load burnout cache: {e}", flush=True)
         return {}
 
 
+def _validate_change(change: dict, fixed_starts_by_date: dict, fixed_reach_by_date: dict) -> bool:
+    """
+    Check a proposed move from the optimizer against the fixed events.
+
+    Each time is parsed once, as naive local time (Gemini returns wall-clock times,
+    so any offset suffix is dropped rather than converted).
+
+    Args:
+        change: Proposed change with current_start, proposed_start and proposed_end
+        fixed_starts_by_date: date -> sorted start times of that day's fixed events
+        fixed_reach_by_date: date -> running max of those events' end times
+
+    Returns:
+        True if the move stays on the same day and overlaps no fixed event
+        (False as well if any of its times can't be parsed)
+    """
+    try:
+        prop_start = _parse_iso(_TZ_RE.sub('', change.get('proposed_start', '')))
+        prop_end = _parse_iso(_TZ_RE.sub('', change.get('proposed_end', '')))
+        current_start = _parse_iso(_TZ_RE.sub('', change.get('current_start', '')))
+    except (TypeError, ValueError):
+        return False
+
+    # RULE 1: Must stay on same day
+    prop_date = prop_start.date()
+    if prop_date != current_start.date():
+        return False
+
+    # RULE 2: No overlap with fixed events on that day (only those starting
+    # before the proposed end can overlap)
+    idx = bisect.bisect_left(fixed_starts_by_date.get(prop_date, ()), prop_end)
+    return not (idx > 0 and fixed_reach_by_date[prop_date][idx - 1] > prop_start)
+
+
 def optimize_schedule_tool(user_id: str = 'default_user',
                            week_start: str = None,
                            sleep_time: str = '00:00',
@@ -1807,26 +2275,19 @@ def optimize_schedule_tool(user_id: str = 'default_user',
 
             try:
                 if isinstance(startISO, str):
-                    if startISO.endswith('Z'):
-                        startISO = startISO[:-1] + '+00:00'
-                    event_start = datetime.fromisoformat(startISO)
-                    if event_start.tzinfo:
-                        event_start = event_start.astimezone().replace(tzinfo=None)
+                    event_start = _parse_local(startISO)
                 else:
                     continue
 
                 # Check if within our week range
-                if not (start_date <= event_start.date() < end_date):
+                event_date = event_start.date()
+                if not (start_date <= event_date < end_date):
                     continue
 
                 # Parse end time
                 endISO = event.get('endISO') or event.get('endTs')
                 if endISO and isinstance(endISO, str):
-                    if endISO.endswith('Z'):
-                        endISO = endISO[:-1] + '+00:00'
-                    event_end = datetime.fromisoformat(endISO)
-                    if event_end.tzinfo:
-                        event_end = event_end.astimezone().replace(tzinfo=None)
+                    event_end = _parse_local(endISO)
                 else:
                     event_end = event_start + timedelta(hours=1)
 
@@ -1835,6 +2296,7 @@ def optimize_schedule_tool(user_id: str = 'default_user',
                     'title': event.get('title', 'Event'),
                     'start': event_start,
                     'end': event_end,
+                    '_date': event_date,
                     'type': event.get('type', 'event'),
                     'status': event.get('status', 'fixed'),
                     'duration_minutes': int((event_end - event_start).total_seconds() / 60)
@@ -1859,105 +2321,44 @@ def optimize_schedule_tool(user_id: str = 'default_user',
         fixed_events.sort(key=lambda x: x['start'])
         malleable_events.sort(key=lambda x: x['start'])
 
-        # Format fixed events for prompt
-        fixed_text = "\n\nFIXED EVENTS (cannot be moved):\n"
-        for ev in fixed_events:
-            fixed_text += f"  {ev['start'].strftime('%a %m/%d %I:%M %p')} - {ev['end'].strftime('%I:%M %p')}: {ev['title']} ({ev['type']})\n"
-
-        if not fixed_events:
-            fixed_text += "  (No fixed events)\n"
-
-        # Format malleable events for prompt
-        malleable_text = "\n\nMALLEABLE EVENTS (can be rescheduled):\n"
-        for ev in malleable_events:
-            malleable_text += f"  ID: {ev['id']}\n"
-            malleable_text += f"  Title: {ev['title']} ({ev['type']})\n"
-            malleable_text += f"  Current: {ev['start'].strftime('%a %m/%d %I:%M %p')} - {ev['end'].strftime('%I:%M %p')}\n"
-            malleable_text += f"  Duration: {ev['duration_minutes']} minutes\n\n"
-
         # Build optimization prompt - include ISO timestamps for accuracy
         # Format events with ISO strings for the AI
-        fixed_iso_text = "\n\nFIXED EVENTS (cannot be moved):\n"
+        parts = ["\n\nFIXED EVENTS (cannot be moved):\n"]
+        _append = parts.append
         for ev in fixed_events:
-            fixed_iso_text += f"  {ev['start'].strftime('%a %m/%d %I:%M %p')} - {ev['end'].strftime('%I:%M %p')}: {ev['title']} ({ev['type']})\n"
-            fixed_iso_text += f"    [ISO: {ev['start'].isoformat()} to {ev['end'].isoformat()}]\n"
+            _append(f"  {_fmt_short(ev['start'])} - {_fmt_ampm(ev['end'])}: {ev['title']} ({ev['type']})\n")
+            _append(f"    [ISO: {ev['start'].isoformat()} to {ev['end'].isoformat()}]\n")
 
         if not fixed_events:
-            fixed_iso_text += "  (No fixed events)\n"
+            _append("  (No fixed events)\n")
+        fixed_iso_text = "".join(parts)
 
-        malleable_iso_text = "\n\nMALLEABLE EVENTS (can be rescheduled):\n"
+        parts = ["\n\nMALLEABLE EVENTS (can be rescheduled):\n"]
+        _append = parts.append
         for ev in malleable_events:
-            malleable_iso_text += f"  ID: {ev['id']}\n"
-            malleable_iso_text += f"  Title: {ev['title']} ({ev['type']})\n"
-            malleable_iso_text += f"  Current: {ev['start'].strftime('%a %m/%d %I:%M %p')} - {ev['end'].strftime('%I:%M %p')}\n"
-            malleable_iso_text += f"  ISO Start: {ev['start'].isoformat()}\n"
-            malleable_iso_text += f"  ISO End: {ev['end'].isoformat()}\n"
-            malleable_iso_text += f"  Duration: {ev['duration_minutes']} minutes\n\n"
+            _append(f"  ID: {ev['id']}\n")
+            _append(f"  Title: {ev['title']} ({ev['type']})\n")
+            _append(f"  Current: {_fmt_short(ev['start'])} - {_fmt_ampm(ev['end'])}\n")
+            _append(f"  ISO Start: {ev['start'].isoformat()}\n")
+            _append(f"  ISO End: {ev['end'].isoformat()}\n")
+            _append(f"  Duration: {ev['duration_minutes']} minutes\n\n")
+        malleable_iso_text = "".join(parts)
 
         optimize_prompt = f"""You are a schedule optimization expert helping reduce burnout.
 
-Week: {start_date.strftime('%B %d')} - {end_date.strftime('%B %d, %Y')}
+Week: {_MONTH_FULL[start_date.month]} {start_date.day:02d} - {_MONTH_FULL[end_date.month]} {end_date.day:02d}, {end_date.year}
 Sleep: {sleep_time} | Wake: {wake_time}
 {fixed_iso_text}
 {malleable_iso_text}
 
-CRITICAL OPTIMIZATION RULES (MUST FOLLOW ALL):
-1. **SAME DAY ONLY** - The proposed_start date MUST match current_start date EXACTLY!
-   - If current is 2026-01-13, proposed MUST be 2026-01-13 (NOT 2026-01-14 or 2026-01-15!)
-   - NEVER change the YYYY-MM-DD portion, only change the HH:MM:SS
-   - A meal on Wednesday stays on Wednesday, a nap on Monday stays on Monday
-2. **ABSOLUTELY NO CONFLICTS** - Before proposing ANY time, verify it does NOT overlap with fixed events:
-   - For each malleable event, look at the FIXED events on that SAME DAY
-   - Your proposed time CANNOT start during a fixed event
-   - Your proposed time CANNOT end during a fixed event
-   - Example: If pstat 171 is 14:00-15:00, you CANNOT propose 14:00, 14:30, or any time that overlaps
-3. Keep at least 15-minute buffers between events when possible
-4. Avoid scheduling events during sleep hours ({sleep_time} to {wake_time})
-5. Consider event types for optimal timing (but ONLY if the slot is FREE):
-   - Breakfast: 7-9 AM
-   - Lunch: 11 AM - 1 PM (but CHECK for conflicts first!)
-   - Dinner: 5-8 PM
-   - Naps: Early afternoon (1-4 PM) for best rest
-   - Exercise: Morning (6-10 AM) or late afternoon (4-6 PM)
-6. Preserve the original duration of each event
-7. If no conflict-free optimal time exists, use action "keep" instead of "move"
-
-IMPORTANT:
-- Use 24-HOUR TIME FORMAT (e.g., 14:00 for 2 PM, 09:00 for 9 AM)
-- Use the EXACT ISO format from the input for dates
-- The proposed times must use the SAME date as the current_start (same YYYY-MM-DD)
-
-For each malleable event, decide:
-- KEEP: If current time is already good for that event type
-- MOVE: Only if a significantly better time slot exists ON THE SAME DAY
-
-Return ONLY valid JSON (no markdown):
-
-{{
-  "proposed_changes": [
-    {{
-      "event_id": "the event's ID (copy exactly from input)",
-      "event_title": "event title",
-      "action": "keep" or "move",
-      "current_start": "copy the ISO Start from input",
-      "current_end": "copy the ISO End from input",
-      "proposed_start": "YYYY-MM-DDTHH:MM:SS (24-hour format! 2PM = 14:00, same date as current)",
-      "proposed_end": "YYYY-MM-DDTHH:MM:SS (24-hour format! maintain original duration)",
-      "reasoning": "Brief explanation of why this time is better (or why keeping is best)"
-    }}
-  ],
-  "summary": "Brief overall optimization summary"
-}}"""
+{_optimize_rules(sleep_time, wake_time)}"""
 
         # Get API key
-        api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+        api_key = _get_api_key()
         if not api_key:
             return json.dumps({"error": "API key not found"})
 
-        if not os.getenv('GOOGLE_API_KEY'):
-            os.environ['GOOGLE_API_KEY'] = api_key
-
-        client = genai.Client()
+        client = _get_client()
 
         # Try models
         models_to_try = [
@@ -1967,22 +2368,10 @@ Return ONLY valid JSON (no markdown):
             'gemini-2.5-flash',
         ]
 
-        gemini_response = None
-        last_error = None
-
-        for model in models_to_try:
-            try:
-                response = client.models.generate_content(
-                    model=model,
-                    contents=optimize_prompt,
-                )
-                gemini_response = response.text
-                break
-            except Exception as e:
-                last_error = e
-                if '429' in str(e) or 'RESOURCE_EXHAUSTED' in str(e):
-                    time.sleep(2)
-                continue
+        # Race the candidate models concurrently and take the first answer. No
+        # retry pass: a rate-limited model's breaker stays open for the cooldown,
+        # so a second pass within it would have nothing left to try
+        gemini_response, last_error = _run_async(_first_success(client, models_to_try, optimize_prompt))
 
         if not gemini_response:
             gemini_response = _try_rest_api_fallback(api_key, optimize_prompt, last_error)
@@ -1991,15 +2380,7 @@ Return ONLY valid JSON (no markdown):
             return json.dumps({"error": f"All models failed: {last_error}"})
 
         # Parse response
-        cleaned = gemini_response.strip()
-        if cleaned.startswith('```json'):
-            cleaned = cleaned[7:]
-        elif cleaned.startswith('```'):
-            cleaned = cleaned[3:]
-        if cleaned.endswith('```'):
-            cleaned = cleaned[:-3]
-
-        result = json.loads(cleaned.strip())
+        result = _loads(_strip_markdown_fence(gemini_response))
 
         # Filter to only include actual moves
         changes = result.get('proposed_changes', [])
@@ -2007,51 +2388,21 @@ Return ONLY valid JSON (no markdown):
 
         # Build a lookup map from event ID to ensure we have valid MongoDB IDs
         id_lookup = {ev['id']: ev for ev in malleable_events}
-        title_lookup = {ev['title'].lower(): ev for ev in malleable_events}
-
-        # Helper function to check if a proposed time conflicts with fixed events
-        def has_conflict(proposed_start_str, proposed_end_str, fixed_events, event_title=""):
-            try:
-                # Parse the proposed times - Gemini returns naive local time strings
-                # DON'T add timezone - treat as naive local time to match fixed_events
-                clean_start = proposed_start_str.replace('Z', '').replace('+00:00', '')
-                clean_end = proposed_end_str.replace('Z', '').replace('+00:00', '')
-
-                # Handle potential timezone suffix
-                if '+' in clean_start:
-                    clean_start = clean_start.split('+')[0]
-                if '+' in clean_end:
-                    clean_end = clean_end.split('+')[0]
-                if '-' in clean_start and clean_start.count('-') > 2:
-                    # Has timezone like -08:00
-                    clean_start = clean_start.rsplit('-', 1)[0]
-                if '-' in clean_end and clean_end.count('-') > 2:
-                    clean_end = clean_end.rsplit('-', 1)[0]
-
-                prop_start = datetime.fromisoformat(clean_start)
-                prop_end = datetime.fromisoformat(clean_end)
-
-                print(f"DEBUG has_conflict: Checking '{event_title}'", flush=True)
-                print(f"  Proposed: {prop_start} to {prop_end}", flush=True)
-            except Exception as e:
-                print(f"DEBUG has_conflict: Parse error for {proposed_start_str}: {e}", flush=True)
-                return True  # Invalid date format, reject
-
-            # Only check fixed events on the SAME DAY as the proposed time
-            prop_date = prop_start.date()
-            same_day_fixed = [f for f in fixed_events if f['start'].date() == prop_date]
-            print(f"  Checking against {len(same_day_fixed)} fixed events on {prop_date}", flush=True)
-
-            for fixed in same_day_fixed:
-                fixed_start = fixed['start']
-                fixed_end = fixed['end']
-                print(f"  vs Fixed '{fixed['title']}': {fixed_start} to {fixed_end}", flush=True)
-                # Check for overlap: two ranges overlap if start1 < end2 AND end1 > start2
-                if prop_start < fixed_end and prop_end > fixed_start:
-                    print(f"  CONFLICT DETECTED!", flush=True)
-                    return True
-            print(f"  No conflict found", flush=True)
-            return False
+        title_lookup = None  # built on the first ID miss; Gemini usually returns valid IDs
+
+        # Index fixed events by day as start/end columns; fixed_events is sorted by
+        # start, so each day's columns are too and overlap checks can bisect to the
+        # events starting before the proposed end instead of scanning the whole week
+        fixed_starts_by_date = defaultdict(list)
+        fixed_ends_by_date = defaultdict(list)
+        for fixed in fixed_events:
+            fixed_starts_by_date[fixed['_date']].append(fixed['start'])
+            fixed_ends_by_date[fixed['_date']].append(fixed['end'])
+
+        # Sweep each day once for the running max of fixed end times: a proposed
+        # slot overlaps a fixed event iff the latest end among the events starting
+        # before the slot's end is past the slot's start
+        fixed_reach_by_date = {day: list(accumulate(ends, max)) for day, ends in fixed_ends_by_date.items()}
 
         # Validate and fix event IDs in the response
         validated_changes = []
@@ -2062,6 +2413,8 @@ Return ONLY valid JSON (no markdown):
                 matched = True
             else:
                 # Try matching by title as fallback
+                if title_lookup is None:
+                    title_lookup = {ev['title'].lower(): ev for ev in malleable_events}
                 title = change.get('event_title', '').lower()
                 if title in title_lookup:
                     change['event_id'] = title_lookup[title]['id']
@@ -2069,49 +2422,15 @@ Return ONLY valid JSON (no markdown):
                 else:
                     matched = False
 
-            if matched:
-                # Double-check for conflicts with fixed events on the same day
-                proposed_start = change.get('proposed_start', '')
-                proposed_end = change.get('proposed_end', '')
-
-                # Parse proposed times (naive local time)
-                try:
-                    clean_start = proposed_start.replace('Z', '').split('+')[0]
-                    clean_end = proposed_end.replace('Z', '').split('+')[0]
-                    current_start_str = change.get('current_start', '').replace('Z', '').split('+')[0]
-
-                    prop_start = datetime.fromisoformat(clean_start)
-                    prop_end = datetime.fromisoformat(clean_end)
-                    current_start = datetime.fromisoformat(current_start_str)
-
-                    prop_date = prop_start.date()
-                    current_date = current_start.date()
-
-                    # RULE 1: Must stay on same day
-                    if prop_date != current_date:
-                        continue
-
-                    # RULE 2: Check for conflicts with fixed events on same day
-                    has_conflict = False
-                    for fixed in fixed_events:
-                        if fixed['start'].date() != prop_date:
-                            continue
-                        # Check overlap
-                        if prop_start < fixed['end'] and prop_end > fixed['start']:
-                            has_conflict = True
-                            break
-
-                    if not has_conflict:
-                        validated_changes.append(change)
-                except Exception:
-                    # Skip if we can't validate
-                    continue
+            # Double-check the move stays on its day and clear of fixed events
+            if matched and _validate_change(change, fixed_starts_by_date, fixed_reach_by_date):
+                validated_changes.append(change)
 
         return json.dumps({
             "success": True,
             "proposed_changes": validated_changes,
             "summary": result.get('summary', f"Found {len(validated_changes)} optimization(s)") if validated_changes else "No optimization suggestions available"
-        }, indent=2)
+        }, separators=(',', ':'))
 
     except json.JSONDecodeError as e:
         return json.dumps({"error": f"Failed to parse AI response: {e}"})
@@ -2123,10 +2442,18 @@ Return ONLY valid JSON (no markdown):
 TOOLS = [get_calendar_events_tool, create_calendar_event_tool, find_free_time_tool, calculate_nap_time_tool, calculate_meal_windows_tool]
 
 
+def _context_cutoff(days_back: int) -> datetime:
+    """Start of the calendar context window, truncated to the minute so calls within a minute share it"""
+    return datetime.now().replace(second=0, microsecond=0) - timedelta(days=days_back)
+
+
 def load_calendar_context(user_id: str = 'default_user', days_back: int = 10) -> str:
     """
     Load calendar events from user_calendars.json and filter by date range
     
+    The formatted context is cached per calendar file modification time and
+    minute, so repeated queries don't re-read and re-parse every event.
+    
     Args:
         user_id: User ID to load calendar data for (default: 'default_user')
         days_back: Number of days to look back (default: 10)
@@ -2135,166 +2462,110 @@ def load_calendar_context(user_id: str = 'default_user', days_back: int = 10) ->
         Formatted string with calendar events context, or empty string if no data
     """
     try:
-        # Get the directory where this script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        user_calendars_path = os.path.join(script_dir, 'user_data', f'{user_id}_calendars.json')
-        
-        if not os.path.exists(user_calendars_path):
-            return ""
-        
-        # Load calendar data
-        with open(user_calendars_path, 'r') as f:
-            calendar_data = json.load(f)
-        
-        events = calendar_data.get('events', [])
-        if not events:
+        user_calendars_path = _user_path(user_id, 'calendars.json')
+        try:
+            mtime_ns = os.stat(user_calendars_path).st_mtime_ns
+        except FileNotFoundError:
             return ""
         
-        # Calculate date range (last 90 days by default)
-        now = datetime.now()
-        cutoff_date = now - timedelta(days=days_back)
+        return _load_calendar_context_cached(user_calendars_path, days_back, mtime_ns, _context_cutoff(days_back))
         
-        # Filter and format events
-        filtered_events = []
-        for event in events:
-            # Parse event start time
-            start_data = event.get('start', {})
-            event_start = None
-            
-            if 'dateTime' in start_data:
-                dt_str = start_data['dateTime']
-                # Handle 'Z' timezone indicator (UTC)
-                if dt_str.endswith('Z'):
-                    dt_str = dt_str[:-1] + '+00:00'
-                try:
-                    event_start = datetime.fromisoformat(dt_str)
-                    # Convert to local time if timezone info present
-                    if event_start.tzinfo:
-                        event_start = event_start.astimezone().replace(tzinfo=None)
-                except (ValueError, AttributeError):
-                    # Fallback: try parsing without timezone
-                    try:
-                        # Remove timezone offset (everything after + or - at the end)
-                        if '+' in dt_str:
-                            dt_str = dt_str.split('+')[0]
-                        elif dt_str.count('-') > 2:  # Has timezone offset
-                            # Find the last '-' that's part of timezone (before timezone)
-                            parts = dt_str.rsplit('-', 1)
-                            if len(parts) == 2 and ':' in parts[1]:
-                                dt_str = parts[0]
-                        event_start = datetime.fromisoformat(dt_str)
-                    except ValueError:
-                        continue
-            elif 'date' in start_data:
+    except Exception as e:
+        print(f"Warning: Could not load calendar context: {e}", flush=True)
+        return ""
+
+
+@functools.lru_cache(maxsize=32)
+def _load_calendar_context_cached(user_calendars_path: str, days_back: int, mtime_ns: int, cutoff_date: datetime) -> str:
+    """Build the calendar context for load_calendar_context (mtime_ns is only part of the cache key)"""
+    # Load calendar data
+    with open(user_calendars_path, 'r') as f:
+        calendar_data = json.load(f)
+    
+    events = calendar_data.get('events', [])
+    if not events:
+        return ""
+    
+    # Google Calendar returns events ordered by start, and ISO 8601 strings sort
+    # chronologically, so when the raw start strings are in order skip straight to
+    # the ones near the cutoff instead of parsing the whole history. The bisect
+    # starts a day early to allow for UTC offsets; the exact cutoff is applied below.
+    starts_raw = [ev.get('start', {}).get('dateTime') or ev.get('start', {}).get('date', '') for ev in events]
+    if all(map(le, starts_raw, starts_raw[1:])):
+        events = events[bisect.bisect_left(starts_raw, (cutoff_date - timedelta(days=1)).isoformat()):]
+    
+    # Filter and format events
+    filtered_events = []
+    for event in events:
+        # Parse event start time
+        start_data = event.get('start', {})
+        event_start = None
+        
+        if 'dateTime' in start_data:
+            dt_str = start_data['dateTime']
+            try:
+                event_start = _parse_local(dt_str)
+            except (ValueError, AttributeError):
+                # Fallback: try parsing without timezone
                 try:
-                    event_start = datetime.fromisoformat(start_data['date'])
+                    event_start = _parse_iso_slow(dt_str)
                 except ValueError:
                     continue
-            else:
+        elif 'date' in start_data:
+            try:
+                event_start = _parse_iso(start_data['date'])
+            except ValueError:
                 continue
+        else:
+            continue
+        
+        # Only include events within the date range
+        if event_start and event_start >= cutoff_date:
+            summary = event.get('summary', 'No title')
+            end_data = event.get('end', {})
+            end_str = 'Unknown'
             
-            # Only include events within the date range
-            if event_start and event_start >= cutoff_date:
-                summary = event.get('summary', 'No title')
-                end_data = event.get('end', {})
-                end_str = 'Unknown'
-                
-                if 'dateTime' in end_data:
-                    dt_str = end_data['dateTime']
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str.replace('Z', '+00:00')
-                    # ...continue with parsing dt_str as a datetime...
-        # Filter and format events
-        filtered_events = []
-        for event in events:
-            # Parse event start time
-            start_data = event.get('start', {})
-            event_start = None
-            
-            if 'dateTime' in start_data:
-                dt_str = start_data['dateTime']
-                # Handle 'Z' timezone indicator (UTC)
-                if dt_str.endswith('Z'):
-                    dt_str = dt_str[:-1] + '+00:00'
-                try:
-                    event_start = datetime.fromisoformat(dt_str)
-                    # Convert to local time if timezone info present
-                    if event_start.tzinfo:
-                        event_start = event_start.astimezone().replace(tzinfo=None)
-                except (ValueError, AttributeError):
-                    # Fallback: try parsing without timezone
-                    try:
-                        # Remove timezone offset (everything after + or - at the end)
-                        if '+' in dt_str:
-                            dt_str = dt_str.split('+')[0]
-                        elif dt_str.count('-') > 2:  # Has timezone offset
-                            # Find the last '-' that's part of timezone (before timezone)
-                            parts = dt_str.rsplit('-', 1)
-                            if len(parts) == 2 and ':' in parts[1]:
-                                dt_str = parts[0]
-                        event_start = datetime.fromisoformat(dt_str)
-                    except ValueError:
-                        continue
-            elif 'date' in start_data:
+            if 'dateTime' in end_data:
+                dt_str = end_data['dateTime']
                 try:
-                    event_start = datetime.fromisoformat(start_data['date'])
+                    event_end = _parse_local(dt_str)
+                    end_str = event_end.strftime('%Y-%m-%d %H:%M')
                 except ValueError:
-                    continue
-            else:
-                continue
+                    end_str = dt_str.split('T')[0] if 'T' in dt_str else 'Unknown'
+            elif 'date' in end_data:
+                end_str = end_data['date']
             
-            # Only include events within the date range
-            if event_start and event_start >= cutoff_date:
-                summary = event.get('summary', 'No title')
-                end_data = event.get('end', {})
-                end_str = 'Unknown'
-                
-                if 'dateTime' in end_data:
-                    dt_str = end_data['dateTime']
-                    if dt_str.endswith('Z'):
-                        dt_str = dt_str.replace('Z', '+00:00')
-                    try:
-                        event_end = datetime.fromisoformat(dt_str)
-                        if event_end.tzinfo:
-                            event_end = event_end.astimezone().replace(tzinfo=None)
-                        end_str = event_end.strftime('%Y-%m-%d %H:%M')
-                    except ValueError:
-                        end_str = dt_str.split('T')[0] if 'T' in dt_str else 'Unknown'
-                elif 'date' in end_data:
-                    end_str = end_data['date']
-                
-                filtered_events.append({
-                    'title': summary,
-                    'start': event_start.strftime('%Y-%m-%d %H:%M'),
-                    'end': end_str,
-                    'description': event.get('description', '')
-                })
-        
-        # Sort by start time
-        filtered_events.sort(key=lambda x: x['start'])
-        
-        if not filtered_events:
-            return ""
-        
-        # Format into context string
-        context = f"\n\nUser's calendar events from the last {days_back} days ({len(filtered_events)} events):\n"
-        for i, event in enumerate(filtered_events[:50], 1):  # Limit to 50 events to avoid token limits
-            context += f"{i}. {event['title']}\n"
-            context += f"   Time: {event['start']} - {event['end']}\n"
-            if event['description']:
-                # Truncate long descriptions
-                desc = event['description'][:100] + '...' if len(event['description']) > 100 else event['description']
-                context += f"   Description: {desc}\n"
-            context += "\n"
-        
-        if len(filtered_events) > 50:
-            context += f"... and {len(filtered_events) - 50} more events\n"
-        
-        return context
-        
-    except Exception as e:
-        print(f"Warning: Could not load calendar context: {e}", flush=True)
+            # Truncate long descriptions up front so only the part that's shown is kept
+            description = event.get('description', '')
+            if len(description) > 100:
+                description = description[:100] + '...'
+            
+            filtered_events.append({
+                'title': summary,
+                'start': event_start.strftime('%Y-%m-%d %H:%M'),
+                'end': end_str,
+                'description': description
+            })
+    
+    # Sort by start time
+    filtered_events.sort(key=lambda x: x['start'])
+    
+    if not filtered_events:
         return ""
+    
+    # Format into context string
+    parts = [f"\n\nUser's calendar events from the last {days_back} days ({len(filtered_events)} events):\n"]
+    _append = parts.append
+    for i, event in enumerate(filtered_events[:50], 1):  # Limit to 50 events to avoid token limits
+        _append(f"{i}. {event['title']}\n   Time: {event['start']} - {event['end']}\n")
+        if event['description']:
+            _append(f"   Description: {event['description']}\n")
+        _append("\n")
+    
+    if len(filtered_events) > 50:
+        _append(f"... and {len(filtered_events) - 50} more events\n")
+    
+    return "".join(parts)
 
 
 def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) -> str:
@@ -2311,7 +2582,7 @@ def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) ->
     """
     # Get API key - use standard Gemini API (simpler than Vertex AI)
     # Support both GEMINI_API_KEY (legacy) and GOOGLE_API_KEY
-    api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
+    api_key = _get_api_key()
 
     if not api_key:
         raise ValueError(
@@ -2320,10 +2591,6 @@ def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) ->
             "Set it: export GOOGLE_API_KEY='your-key'"
         )
 
-    # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-    if not os.getenv('GOOGLE_API_KEY'):
-        os.environ['GOOGLE_API_KEY'] = api_key
-
     # Load calendar context from user_calendars.json
     calendar_context = load_calendar_context(user_id=user_id, days_back=days_back)
     
@@ -2332,8 +2599,8 @@ def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) ->
     if calendar_context:
         full_query = query + calendar_context
 
-    # Create client - will automatically use GOOGLE_API_KEY from environment
-    client = genai.Client()
+    # Reuse the shared client - it picks up GOOGLE_API_KEY from the environment
+    client = _get_client()
 
     # List of models to try in order (prioritize those with quota available)
     models_to_try = [
@@ -2344,9 +2611,14 @@ def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) ->
         'gemma-3-4b',             # Available
     ]
 
+    # Models whose breaker is open hit their quota recently and are skipped
+    available = [model for model in models_to_try if _breaker_allows(model)]
+    if not available:
+        raise Exception(f"All models are rate limited, try again in up to {_BREAKER_COOLDOWN}s")
+
     last_error = None
 
-    for model in models_to_try:
+    for model in available:
         try:
             # Use automatic function calling
             response = client.models.generate_content(
@@ -2360,12 +2632,13 @@ def run_query(query: str, user_id: str = 'default_user', days_back: int = 10) ->
                     )
                 )
             )
+            _breaker_record(model, True)
             return response.text
 
         except Exception as e:
-            error_str = str(e)
-            # If it's a quota error, try next model
-            if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
+            # If it's a quota error, skip the model for a while and try the next one
+            if _is_rate_limited(e):
+                _breaker_record(model, False, rate_limited=True)
                 last_error = e
                 continue
             # If it's not a quota error, raise it immediately
@@ -6,11 +6,48 @@ Uses token.json for authentication
 
 import os
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from bisect import bisect_left, bisect_right
+import httplib2
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+# Most calls Google's batch endpoint accepts in one HTTP request
+BATCH_LIMIT = 50
+
+# Socket timeout (seconds) for Calendar API connections
+HTTP_TIMEOUT = 30
+
+# get_events results are reused within the same window of this many seconds
+EVENTS_CACHE_TTL = 60
+
+# Parse an ISO 8601 timestamp (ciso8601 is optional and several times faster)
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    def _parse_iso(value):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _rfc3339_utc(seconds):
+    """Format a Unix timestamp as an RFC 3339 UTC time, e.g. '2025-01-31T17:00:00Z'"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+
+def build_calendar_service(creds):
+    """
+    Build a Calendar v3 service from the discovery document bundled with
+    google-api-python-client, without fetching it or going through the
+    discovery file cache
+    """
+    return build('calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
+
 
 class CalendarTools:
     """
@@ -35,12 +72,53 @@ class CalendarTools:
         creds = Credentials.from_authorized_user_file(token_path)
 
         # Build service
-        self.service = build('calendar', 'v3', credentials=creds)
+        self.service = build_calendar_service(creds)
+
+        # Per-thread HTTP transports and the worker pool for concurrent requests
+        self._creds = creds
+        self._local = threading.local()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # get_events results by (days_ahead, max_results, time bucket, generation);
+        # writes bump the generation so nothing cached before them is served again
+        self._events_cache = {}
+        self._cache_gen = 0
+        self._cache_lock = threading.Lock()
+
+    def _http(self):
+        """
+        Authorized HTTP transport for the calling thread
+
+        httplib2 connections aren't thread-safe, so each thread gets its own,
+        which it then keeps reusing.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self._creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        return http
+
+    def _executor(self):
+        """Worker pool for concurrent requests (created on first use and kept, so its connections stay warm)"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='calendar')
+        return self._pool
+
+    def _invalidate_events(self):
+        """Drop cached get_events results after a write to the calendar"""
+        with self._cache_lock:
+            self._cache_gen += 1
+            self._events_cache.clear()
 
     def get_events(self, days_ahead=7, max_results=10):
         """
         Get upcoming events
 
+        Repeated calls with the same arguments within EVENTS_CACHE_TTL seconds
+        are answered from memory until the calendar is next written to.
+
         Args:
             days_ahead: How many days to look ahead
             max_results: Maximum number of events to return
@@ -48,41 +126,97 @@ class CalendarTools:
         Returns:
             List of event dictionaries
         """
+        bucket = int(time.time() // EVENTS_CACHE_TTL)
+        with self._cache_lock:
+            key = (days_ahead, max_results, bucket, self._cache_gen)
+            cached = self._events_cache.get(key)
+        if cached is not None:
+            # Copies, so a caller editing its events can't change what others read
+            return [dict(event) for event in cached]
+
+        events = self._fetch_events(days_ahead, max_results)
+        if events is not None:
+            with self._cache_lock:
+                if key[3] == self._cache_gen:
+                    # Only the current bucket can hit again, so older ones go
+                    for stale in [k for k in self._events_cache if k[2] != bucket]:
+                        del self._events_cache[stale]
+                    self._events_cache[key] = events
+            return [dict(event) for event in events]
+        return []
+
+    def _fetch_events(self, days_ahead, max_results):
+        """
+        Fetch and format upcoming events from the API
+
+        Returns:
+            List of event dictionaries, or None if the request failed
+        """
         try:
-            now = datetime.utcnow().isoformat() + 'Z'
-            end_time = (datetime.utcnow() + timedelta(days=days_ahead)).isoformat() + 'Z'
+            return list(islice(self.iter_events(days_ahead, max_results), max_results))
+
+        except HttpError as error:
+            print(f'Error fetching events: {error}')
+            return None
+
+    def iter_events(self, days_ahead=7, max_results=10):
+        """
+        Yield upcoming events one at a time, fetching the next page only
+        once the current one has been consumed
 
+        Args:
+            days_ahead: How many days to look ahead
+            max_results: Page size to request
+
+        Yields:
+            Event dictionaries in start time order (errors raise HttpError)
+        """
+        now_s = time.time()
+        now = _rfc3339_utc(now_s)
+        end_time = _rfc3339_utc(now_s + days_ahead * 86400)
+        page_token = None
+
+        while True:
             events_result = self.service.events().list(
                 calendarId='primary',
                 timeMin=now,
                 timeMax=end_time,
                 maxResults=max_results,
                 singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+                orderBy='startTime',
+                pageToken=page_token,
+                fields='items(id,summary,start,end,description,location),nextPageToken'
+            ).execute(http=self._http())
 
             # Format for easier consumption
-            formatted_events = []
-            for event in events:
+            for event in events_result.get('items', []):
                 start = event['start'].get('dateTime', event['start'].get('date'))
                 end = event['end'].get('dateTime', event['end'].get('date'))
 
-                formatted_events.append({
+                yield {
                     'id': event['id'],
                     'title': event.get('summary', 'Untitled'),
                     'start': start,
                     'end': end,
                     'description': event.get('description', ''),
                     'location': event.get('location', '')
-                })
+                }
 
-            return formatted_events
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return
 
-        except HttpError as error:
-            print(f'Error fetching events: {error}')
-            return []
+    def get_events_bulk(self, queries):
+        """
+        Run several get_events queries concurrently
+
+        Args:
+            queries: List of keyword-argument dicts for get_events
+
+        Returns:
+            List of event lists, in the same order as queries
+        """
+        return list(self._executor().map(lambda query: self.get_events(**query), queries))
 
     def create_event(self, title, start_time, duration_minutes=60, description='', location=''):
         """
@@ -102,7 +236,7 @@ class CalendarTools:
             # Parse start time
             if isinstance(start_time, str):
                 # Try to parse ISO format
-                start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+                start_dt = _parse_iso(start_time)
             elif isinstance(start_time, datetime):
                 start_dt = start_time
             else:
@@ -129,8 +263,10 @@ class CalendarTools:
             # Create event
             created_event = self.service.events().insert(
                 calendarId='primary',
-                body=event
-            ).execute()
+                body=event,
+                fields='id,summary,start,htmlLink'
+            ).execute(http=self._http())
+            self._invalidate_events()
 
             return {
                 'id': created_event['id'],
@@ -159,7 +295,7 @@ class CalendarTools:
             event = self.service.events().get(
                 calendarId='primary',
                 eventId=event_id
-            ).execute()
+            ).execute(http=self._http())
 
             # Update fields
             if 'title' in kwargs:
@@ -174,7 +310,7 @@ class CalendarTools:
             if 'start_time' in kwargs:
                 start_time = kwargs['start_time']
                 if isinstance(start_time, str):
-                    start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+                    start_dt = _parse_iso(start_time)
                 else:
                     start_dt = start_time
 
@@ -185,12 +321,14 @@ class CalendarTools:
                     end_dt = start_dt + timedelta(minutes=kwargs['duration_minutes'])
                     event['end']['dateTime'] = end_dt.isoformat()
 
-            # Update on calendar
+            # Update on calendar (the get above stays a full read, since update replaces the whole event)
             updated_event = self.service.events().update(
                 calendarId='primary',
                 eventId=event_id,
-                body=event
-            ).execute()
+                body=event,
+                fields='id,summary,start'
+            ).execute(http=self._http())
+            self._invalidate_events()
 
             return {
                 'id': updated_event['id'],
@@ -216,13 +354,48 @@ class CalendarTools:
             self.service.events().delete(
                 calendarId='primary',
                 eventId=event_id
-            ).execute()
+            ).execute(http=self._http())
+            self._invalidate_events()
             return True
 
         except Exception as error:
             print(f'Error deleting event: {error}')
             return False
 
+    def batch(self, ops):
+        """
+        Run several event writes in as few HTTP requests as possible
+
+        Args:
+            ops: List of (method, params) pairs, where method is 'insert', 'update',
+                 'patch' or 'delete' and params are its events() arguments, e.g.
+                 ('insert', {'body': {...}}) or ('delete', {'eventId': '...'}).
+                 calendarId defaults to 'primary'.
+
+        Returns:
+            Dict mapping each op's index (as a string) to its response, or to the
+            HttpError it failed with
+        """
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = exception if exception is not None else response
+
+        events = self.service.events()
+        try:
+            for offset in range(0, len(ops), BATCH_LIMIT):
+                batch = self.service.new_batch_http_request(callback=callback)
+                for i, (method, params) in enumerate(ops[offset:offset + BATCH_LIMIT], offset):
+                    if method not in ('insert', 'update', 'patch', 'delete'):
+                        raise ValueError(f"Unsupported batch method: {method}")
+                    batch.add(getattr(events, method)(**{'calendarId': 'primary', **params}), request_id=str(i))
+                batch.execute(http=self._http())
+        finally:
+            # Earlier chunks may have gone through even if a later one failed
+            self._invalidate_events()
+
+        return results
+
     def find_free_slots(self, date, duration_minutes=30):
         """
         Find free time slots on a given date
@@ -234,55 +407,95 @@ class CalendarTools:
         Returns:
             List of (start_time, end_time) tuples
         """
-        try:
-            # Get events for that day
-            day_start = datetime.combine(date, datetime.min.time())
-            day_end = day_start + timedelta(days=1)
+        return self.find_free_slots_multi([date], duration_minutes).get(date, [])
 
-            events = self.service.events().list(
-                calendarId='primary',
-                timeMin=day_start.isoformat() + 'Z',
-                timeMax=day_end.isoformat() + 'Z',
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute().get('items', [])
+    def find_free_slots_multi(self, dates, duration_minutes=30):
+        """
+        Find free time slots on several dates with a single freebusy query
 
-            # Build busy times list
-            busy_times = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                end = event['end'].get('dateTime', event['end'].get('date'))
+        Args:
+            dates: Dates to search (date or datetime objects)
+            duration_minutes: Required duration
+
+        Returns:
+            Dict mapping each date to its list of (start_time, end_time) tuples
+        """
+        if not dates:
+            return {}
+
+        try:
+            # One request for the whole span, in local time
+            days = {date: datetime.combine(date, datetime.min.time()) for date in dates}
+            range_start = min(days.values())
+            range_end = max(days.values()) + timedelta(days=1)
+
+            response = self.service.freebusy().query(body={
+                'timeMin': range_start.astimezone().isoformat(),
+                'timeMax': range_end.astimezone().isoformat(),
+                'items': [{'id': 'primary'}]
+            }, fields='calendars(primary(busy,errors))').execute(http=self._http())
+
+            calendar = response.get('calendars', {}).get('primary', {})
+            if calendar.get('errors'):
+                raise ValueError(f"freebusy error: {calendar['errors']}")
+
+            # Busy intervals come back in UTC; keep their starts and ends as
+            # separate columns of Unix seconds, sorted by start time
+            busy = calendar.get('busy', [])
+            starts = [int(_parse_iso(interval['start']).timestamp()) for interval in busy]
+            ends = [int(_parse_iso(interval['end']).timestamp()) for interval in busy]
+            order = sorted(range(len(starts)), key=starts.__getitem__)
+            starts = [starts[i] for i in order]
+            ends = [ends[i] for i in order]
+
+            # Latest end among the intervals so far, so each day's intervals
+            # are a contiguous slice found by bisection
+            reach = list(accumulate(ends, max))
+
+            free_slots = {}
+            for date, day_start in days.items():
+                lo = bisect_right(reach, int(day_start.timestamp()))
+                hi = bisect_left(starts, int((day_start + timedelta(days=1)).timestamp()))
+
+                # Find gaps (9am-5pm work hours), then convert back to local datetimes
+                gaps = _gap_scan(
+                    starts[lo:hi],
+                    ends[lo:hi],
+                    int(day_start.replace(hour=9, minute=0).timestamp()),
+                    int(day_start.replace(hour=17, minute=0).timestamp()),
+                    duration_minutes * 60
+                )
+                free_slots[date] = [(datetime.fromtimestamp(start), datetime.fromtimestamp(end)) for start, end in gaps]
 
-                start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+            return free_slots
 
-                busy_times.append((start_dt, end_dt))
+        except Exception as error:
+            print(f'Error finding free slots: {error}')
+            return {}
 
-            # Sort by start time
-            busy_times.sort()
 
-            # Find gaps (9am-5pm work hours)
-            work_start = day_start.replace(hour=9, minute=0)
-            work_end = day_start.replace(hour=17, minute=0)
+def _gap_scan(starts, ends, work_start, work_end, duration):
+    """
+    Free slots of at least duration between busy intervals (given as start
+    and end columns sorted by start), from work_start to work_end. All values
+    are integer Unix seconds.
+    """
+    # Busy until: work_start, then the latest end seen before each interval
+    busy_until = list(accumulate(ends, max, initial=work_start))
 
-            free_slots = []
-            current_time = work_start
+    # A gap opens before an interval if it starts far enough past everything earlier
+    free_slots = [(free, start) for free, start in zip(busy_until, starts) if free + duration <= start]
 
-            for busy_start, busy_end in busy_times:
-                # If there's a gap before this busy time
-                if current_time + timedelta(minutes=duration_minutes) <= busy_start:
-                    free_slots.append((current_time, busy_start))
-                current_time = max(current_time, busy_end)
+    # Check time after last event
+    if busy_until[-1] + duration <= work_end:
+        free_slots.append((busy_until[-1], work_end))
 
-            # Check time after last event
-            if current_time + timedelta(minutes=duration_minutes) <= work_end:
-                free_slots.append((current_time, work_end))
+    return free_slots
 
-            return free_slots
 
-        except Exception as error:
-            print(f'Error finding free slots: {error}')
-            return []
+# Shared instance for the agent tools (built once, even with concurrent first callers)
+_INSTANCE = None
+_INSTANCE_LOCK = threading.Lock()
 
 
 # Helper function for LangChain tools
@@ -290,6 +503,9 @@ def get_calendar_tool_instance():
     """
     Get a CalendarTools instance (singleton pattern for the module)
     """
-    if not hasattr(get_calendar_tool_instance, '_instance'):
-        get_calendar_tool_instance._instance = CalendarTools()
-    return get_calendar_tool_instance._instance
+    global _INSTANCE
+    if _INSTANCE is None:
+        with _INSTANCE_LOCK:
+            if _INSTANCE is None:
+                _INSTANCE = CalendarTools()
+    return _INSTANCE
@@ -3,8 +3,9 @@ Test Script for Calendar Agent
 Quick tests to verify everything works
 """
 
+from itertools import islice
 from calendar_agent import run_query
-from calendar_tools import CalendarTools
+from calendar_tools import get_calendar_tool_instance
 
 
 def test_direct_calendar_access():
@@ -16,16 +17,17 @@ def test_direct_calendar_access():
     print("="*80)
 
     try:
-        cal = CalendarTools()
+        # Same instance the agent's calendar tools use, so later tests reuse its service
+        cal = get_calendar_tool_instance()
         print("✅ Successfully loaded credentials")
 
-        # Get events
-        events = cal.get_events(days_ahead=7)
-        print(f"✅ Found {len(events)} upcoming events")
+        # Get events (only as many as the preview shows)
+        events = list(islice(cal.iter_events(days_ahead=7, max_results=3), 3))
+        print(f"✅ Read calendar ({len(events)} upcoming events shown)")
 
         if events:
             print("\nUpcoming events:")
-            for event in events[:3]:
+            for event in events:
                 print(f"  - {event['title']}: {event['start']}")
 
         return True
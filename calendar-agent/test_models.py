@@ -2,38 +2,141 @@
 Quick script to test API key and list available models
 """
 import os
-from google import genai
+import json
+import time
+import asyncio
+import argparse
+import hashlib
 
-# Support both GEMINI_API_KEY (legacy) and GOOGLE_API_KEY
-api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY', 'gen-lang-client-0058781768')
+# Models to probe if listing fails (the same candidates the agent falls back through)
+CANDIDATE_MODELS = [
+    'gemini-3-flash-preview',
+    'gemini-2.0-flash-lite',
+    'gemma-3-12b-it',
+    'gemma-3-27b-it',
+    'gemma-3-4b-it',
+    'gemma-3-1b-it',
+    'gemini-2.5-flash',
+    'gemini-2.5-flash-lite',
+]
 
-print(f"Testing API key: {api_key[:20]}...")
+# Results are kept for a day (per API key) so repeated runs don't hit the API again
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_data', 'model_cache.json')
+CACHE_TTL = 24 * 60 * 60
 
-# Set GOOGLE_API_KEY for genai.Client() to pick up automatically
-if not os.getenv('GOOGLE_API_KEY'):
-    os.environ['GOOGLE_API_KEY'] = api_key
 
-try:
-    client = genai.Client()
+def key_digest(api_key):
+    """Hash of the API key, so results can be matched to it without storing the key"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
 
-    # Try listing models
-    print("\nAttempting to list models...")
-    models = client.models.list()
 
-    print("\nAvailable models:")
-    for model in models:
-        print(f"  - {model.name}")
+def load_cache(api_key):
+    """Return the cached results for api_key, or None if there are none from the last day"""
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('key_sha256') != key_digest(api_key):
+        return None
+    if time.time() - cached.get('checked_at', 0) > CACHE_TTL:
+        return None
+    return cached
 
-except Exception as e:
-    print(f"\nError: {e}")
-    print("\nTrying a simple generation request with gemini-1.5-flash...")
 
+def save_cache(api_key, results):
+    """Store results along with the key they're for and when they were checked"""
     try:
-        client = genai.Client()
-        response = client.models.generate_content(
-            model='gemini-1.5-flash',
-            contents='Say hello'
-        )
-        print(f"Success! Response: {response.text}")
-    except Exception as e2:
-        print(f"Also failed: {e2}")
\ No newline at end of file
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, 'w') as f:
+            json.dump({**results, 'key_sha256': key_digest(api_key), 'checked_at': time.time()}, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Could not save model cache: {e}")
+
+
+async def probe_models(client):
+    """Send a tiny request to every candidate model at once; returns the first that works"""
+    responses = await asyncio.gather(
+        *[client.aio.models.generate_content(model=model, contents='Say hello') for model in CANDIDATE_MODELS],
+        return_exceptions=True
+    )
+
+    working_model = None
+    for model, response in zip(CANDIDATE_MODELS, responses):
+        if isinstance(response, Exception):
+            print(f"  - {model}: failed ({response})")
+        else:
+            print(f"  - {model}: OK")
+            working_model = working_model or model
+    return working_model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--list-only', action='store_true', help="List available models without probing any")
+    mode.add_argument('--probe', action='store_true', help="Skip listing and probe the candidate models directly")
+    parser.add_argument('--refresh', action='store_true', help="Ignore cached results and check again")
+    return parser.parse_args()
+
+
+async def main(args):
+    # Imported here so --help doesn't pay for loading the SDK
+    from google import genai
+
+    # Support both GEMINI_API_KEY (legacy) and GOOGLE_API_KEY
+    api_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY', 'gen-lang-client-0058781768')
+
+    print(f"Testing API key: {api_key[:20]}...")
+
+    # Set GOOGLE_API_KEY for genai.Client() to pick up automatically
+    if not os.getenv('GOOGLE_API_KEY'):
+        os.environ['GOOGLE_API_KEY'] = api_key
+
+    cached = None if args.refresh else load_cache(api_key)
+    # A cached result only counts if it answers what was asked for
+    if cached and args.probe and not cached.get('working_model'):
+        cached = None
+    if cached and args.list_only and not cached.get('models'):
+        cached = None
+    if cached:
+        print(f"\nUsing results from {time.ctime(cached['checked_at'])} (use --refresh to re-check)")
+        if cached.get('models'):
+            print("\nAvailable models:")
+            for name in cached['models']:
+                print(f"  - {name}")
+        if cached.get('working_model'):
+            print(f"\nWorking model: {cached['working_model']}")
+        return
+
+    client = genai.Client()
+
+    if not args.probe:
+        try:
+            # Try listing models
+            print("\nAttempting to list models...")
+            models = [model.name async for model in await client.aio.models.list()]
+
+            print("\nAvailable models:")
+            for name in models:
+                print(f"  - {name}")
+            save_cache(api_key, {'models': models})
+            return
+
+        except Exception as e:
+            print(f"\nError: {e}")
+            if args.list_only:
+                return
+
+    print(f"\nTrying a simple generation request with {len(CANDIDATE_MODELS)} models...")
+
+    working_model = await probe_models(client)
+    if working_model:
+        print(f"Success! Working model: {working_model}")
+        save_cache(api_key, {'working_model': working_model})
+    else:
+        print("All models failed")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -81,9 +81,10 @@ def setup_oauth():
         print(f"✅ Connected to calendar: {calendar.get('summary', 'Primary')}")
 
         # List upcoming events
-        from datetime import datetime, timedelta
-        now = datetime.utcnow().isoformat() + 'Z'
-        week_from_now = (datetime.utcnow() + timedelta(days=7)).isoformat() + 'Z'
+        import time
+        now_s = time.time()
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now_s))
+        week_from_now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now_s + 7 * 86400))
 
         events_result = service.events().list(
             calendarId='primary',
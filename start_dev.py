@@ -5,6 +5,7 @@ Runs: Node.js backend (port 3000), Flask API (port 5001), Vite frontend (port 51
 Handles graceful shutdown on Ctrl+C and detects already-running servers
 """
 
+import asyncio
 import subprocess
 import signal
 import sys
@@ -54,42 +55,74 @@ SERVERS = [
 started_processes: list[subprocess.Popen] = []
 
 
-def check_port(port: int) -> bool:
-    """Check if a port is in use by trying to connect to it."""
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.settimeout(1)
-        return s.connect_ex(('127.0.0.1', port)) == 0
-
-
-def kill_port(port: int) -> bool:
-    """Kill any process using the given port. Returns True if something was killed."""
+def scan_ports(ports: list[int]) -> dict[int, list[int]]:
+    """
+    Find which of the given ports something is listening on, with one lsof call.
+    Returns {port: [pid, ...]} for the ports in use.
+    """
+    in_use: dict[int, list[int]] = {}
     try:
         result = subprocess.run(
-            ['lsof', '-t', '-i', f':{port}'],
+            ['lsof', '-nP', '-F', 'pn', '-sTCP:LISTEN'] + [f'-iTCP:{port}' for port in ports],
             capture_output=True,
             text=True,
         )
-        if result.stdout.strip():
-            pids = result.stdout.strip().split('\n')
-            for pid in pids:
-                try:
-                    os.kill(int(pid), signal.SIGTERM)
-                except (ProcessLookupError, ValueError):
-                    pass
-            time.sleep(1)  # Give processes time to terminate
-            return True
-    except Exception:
-        pass
-    return False
+    except OSError:
+        # No lsof: fall back to seeing which ports accept connections (PIDs unknown)
+        for port in ports:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.settimeout(1)
+                if s.connect_ex(('127.0.0.1', port)) == 0:
+                    in_use[port] = []
+        return in_use
+
+    # Output is a 'p<pid>' record followed by an 'n<address>:<port>' line per socket
+    pid = None
+    for line in result.stdout.splitlines():
+        if line.startswith('p'):
+            pid = int(line[1:])
+        elif line.startswith('n') and pid is not None:
+            try:
+                port = int(line.rsplit(':', 1)[1])
+            except (IndexError, ValueError):
+                continue
+            if port in ports:
+                pids = in_use.setdefault(port, [])
+                if pid not in pids:
+                    pids.append(pid)
+    return in_use
 
 
-def wait_for_port(port: int, name: str, timeout: int = 30) -> bool:
-    """Wait for a port to become available."""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        if check_port(port):
-            return True
-        time.sleep(0.5)
+def kill_pids(pids: list[int]) -> bool:
+    """Terminate the given processes. Returns True if something was killed."""
+    killed = False
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+            killed = True
+        except ProcessLookupError:
+            pass
+    if killed:
+        time.sleep(1)  # Give processes time to terminate
+    return killed
+
+
+async def wait_for_port_async(port: int, timeout: int = 30) -> bool:
+    """Wait for something to start accepting connections on a port."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.02
+    while loop.time() < deadline:
+        # Non-blocking connect, completed by the event loop's selector
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout=1)
+        except (OSError, asyncio.TimeoutError):
+            # Back off from 20ms so a quick server is noticed right away
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+            delay = min(delay * 2, 0.5)
+            continue
+        writer.close()
+        return True
     return False
 
 
@@ -113,11 +146,11 @@ def cleanup(signum=None, frame=None):
     sys.exit(0)
 
 
-def main():
-    # Set up signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, cleanup)
-    signal.signal(signal.SIGTERM, cleanup)
-
+async def main_async() -> bool:
+    """
+    Start every server that isn't already running, then wait for all of them
+    to come up at once. Returns True if nothing needed starting.
+    """
     # Check for --force flag
     force_restart = '--force' in sys.argv or '-f' in sys.argv
 
@@ -128,7 +161,16 @@ def main():
         print(f"{YELLOW}   (Force restart mode){NC}")
     print()
 
+    # One lsof call covers every server's port
+    in_use = scan_ports([server['port'] for server in SERVERS])
+    if force_restart and in_use:
+        print(f"{YELLOW}Killing existing processes on ports {', '.join(map(str, sorted(in_use)))}...{NC}")
+        kill_pids(sorted({pid for pids in in_use.values() for pid in pids}))
+        await asyncio.sleep(0.5)
+        print()
+
     all_running = True
+    launched = []
 
     # Check and start each server
     for i, server in enumerate(SERVERS, 1):
@@ -139,14 +181,9 @@ def main():
 
         print(f"{BLUE}[{i}/{len(SERVERS)}] {name} (port {port}){NC}")
 
-        if check_port(port):
-            if force_restart:
-                print(f"{YELLOW}  Killing existing process on port {port}...{NC}")
-                kill_port(port)
-                time.sleep(0.5)
-            else:
-                print(f"{GREEN}  Already running{NC}")
-                continue
+        if port in in_use and not force_restart:
+            print(f"{GREEN}  Already running{NC}")
+            continue
 
         all_running = False
         print(f"{YELLOW}  Starting {name}...{NC}")
@@ -173,19 +210,7 @@ def main():
                 preexec_fn=os.setsid if hasattr(os, 'setsid') else None,
             )
             started_processes.append(proc)
-
-            # Wait for the server to be ready
-            timeout = server.get('timeout', 45)
-            if wait_for_port(port, name, timeout=timeout):
-                print(f"{GREEN}  {name} started (PID: {proc.pid}){NC}")
-            else:
-                # For Vite, just warn - it might be running on a different port
-                if name == 'Vite Frontend':
-                    print(f"{YELLOW}  {name} may be slow to start (PID: {proc.pid}){NC}")
-                    print(f"{YELLOW}  Check if it's running at http://localhost:5173 or nearby port{NC}")
-                else:
-                    print(f"{RED}  Failed to start {name} - timeout waiting for port {port}{NC}")
-                    cleanup()
+            launched.append((server, proc))
 
         except FileNotFoundError as e:
             print(f"{RED}  Failed to start {name}: {e}{NC}")
@@ -194,6 +219,40 @@ def main():
             print(f"{RED}  Error starting {name}: {e}{NC}")
             cleanup()
 
+    if launched:
+        # The servers boot independently, so wait for all of them together
+        print()
+        print(f"{YELLOW}Waiting for servers to be ready...{NC}")
+        results = await asyncio.gather(
+            *[wait_for_port_async(server['port'], server.get('timeout', 45)) for server, _ in launched],
+            return_exceptions=True,
+        )
+
+        failed = False
+        for (server, proc), ready in zip(launched, results):
+            name = server['name']
+            if ready is True:
+                print(f"{GREEN}  {name} started (PID: {proc.pid}){NC}")
+            elif name == 'Vite Frontend':
+                # For Vite, just warn - it might be running on a different port
+                print(f"{YELLOW}  {name} may be slow to start (PID: {proc.pid}){NC}")
+                print(f"{YELLOW}  Check if it's running at http://localhost:5173 or nearby port{NC}")
+            else:
+                print(f"{RED}  Failed to start {name} - timeout waiting for port {server['port']}{NC}")
+                failed = True
+        if failed:
+            cleanup()
+
+    return all_running
+
+
+def main():
+    # Set up signal handlers for graceful shutdown
+    signal.signal(signal.SIGINT, cleanup)
+    signal.signal(signal.SIGTERM, cleanup)
+
+    all_running = asyncio.run(main_async())
+
     print()
     print(f"{GREEN}========================================{NC}")
     print(f"{GREEN}   All servers are running!            {NC}")